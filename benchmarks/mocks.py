@@ -0,0 +1,333 @@
+import os
+import re
+import json
+import time
+import asyncio
+import itertools
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+from spade_llm.providers.base_provider import BaseLLMProvider
+from src.utils.tokens import estimate_response_tokens
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("planner", "coordinator", "tavily", "arxiv", "wikipedia", "writer", "critic", "summarizer")
+
+# Approximate size of each synthetic text response, in tokens
+DEFAULT_RESPONSE_TOKENS = {
+    "planner": 200,
+    "coordinator": 600,
+    "tavily": 300,
+    "arxiv": 300,
+    "wikipedia": 300,
+    "writer": 1500,
+    "critic": 80,
+    "summarizer": 150,
+}
+
+_WORDS = (
+    "model", "training", "evaluation", "benchmark", "latency", "throughput", "dataset",
+    "architecture", "attention", "retrieval", "agents", "baseline", "results", "method",
+    "analysis", "scaling", "inference", "memory", "accuracy", "robustness",
+)
+
+
+def synthetic_text(subject: str, tokens: int) -> str:
+    """
+    Generate deterministic filler text of roughly the given number of tokens.
+
+    Args:
+        subject: Topic mentioned in every sentence
+        tokens: Target size in tokens
+
+    Returns:
+        Plain text of about tokens * 4 characters
+    """
+    words = itertools.cycle(_WORDS)
+    sentences = []
+    size = 0
+    for i in itertools.count(1):
+        sentence = f"Finding {i} on {subject}: " + " ".join(next(words) for _ in range(12)) + "."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+        if size >= tokens * 4:
+            break
+    return " ".join(sentences)
+
+
+def _last_turn(prompt: List[Dict[str, Any]]):
+    """Split a prompt into the last user message and the tool calls made since."""
+    last_user = max((i for i, m in enumerate(prompt) if m.get("role") == "user"), default=-1)
+    request = (prompt[last_user].get("content") or "") if last_user >= 0 else ""
+
+    called = []
+    results = []
+    for message in prompt[last_user + 1:]:
+        for tool_call in message.get("tool_calls") or []:
+            called.append(tool_call.get("function", {}).get("name"))
+        if message.get("role") == "tool":
+            results.append(message.get("content") or "")
+    return request, called, results
+
+
+def _extract_json(text: str) -> Optional[Dict[str, Any]]:
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+
+
+class MockLLMProvider(BaseLLMProvider):
+    """
+    Stand-in LLM provider that plays one role of the pipeline without a model server.
+
+    Every call sleeps for latency plus the time needed to "generate" the
+    response at tokens_per_second, then returns either a recorded response
+    for its role or a synthetic one shaped like the real agent's output
+    (JSON plans and critiques, tool calls for the coordinator and search
+    agents, markdown reports for the writer).
+    """
+
+    def __init__(
+        self,
+        role: str,
+        latency: float = 0.05,
+        tokens_per_second: float = 200.0,
+        response_tokens: Optional[int] = None,
+        agent_jids: Optional[Dict[str, str]] = None,
+        topics: int = 3,
+        sources: Sequence[str] = ("tavily", "arxiv"),
+        critic_rounds: int = 1,
+        recorded: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            role: One of ROLES
+            latency: Fixed time to first token, in seconds
+            tokens_per_second: Simulated generation speed
+            response_tokens: Size of synthetic text responses. Defaults to DEFAULT_RESPONSE_TOKENS[role].
+            agent_jids: Source name ("tavily", "arxiv") to sub-agent JID, used by the coordinator
+            topics: Number of topics in planner responses
+            sources: Sources the planner assigns to topics, in turn
+            critic_rounds: Number of INSUFFICIENT reviews the critic gives each query before accepting
+            recorded: Recorded text responses for this role, replayed in order instead of synthetic text
+        """
+        super().__init__()
+        if role not in ROLES:
+            raise ValueError(f"Unknown role '{role}'. Expected one of {ROLES}.")
+        self.role = role
+        self.model = f"mock-{role}"
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens or DEFAULT_RESPONSE_TOKENS[role]
+        self.agent_jids = agent_jids or {}
+        self.topics = topics
+        self.sources = list(sources)
+        self.critic_rounds = critic_rounds
+        self.recorded = itertools.cycle(recorded) if recorded else None
+
+        self.calls = 0
+        self.completion_tokens = 0
+        self._reviews: Dict[str, int] = defaultdict(int)
+        self._call_ids = itertools.count(1)
+
+    async def get_llm_response(self, context, tools=None, conversation_id=None, output_schema=None) -> Dict[str, Any]:
+        prompt = context.get_prompt(conversation_id)
+        request, called, results = _last_turn(prompt)
+        response = getattr(self, f"_{self.role}")(request, called, results)
+
+        tokens = estimate_response_tokens(response)
+        self.calls += 1
+        self.completion_tokens += tokens
+        await asyncio.sleep(self.latency + tokens / self.tokens_per_second)
+        return response
+
+    def _text(self, synthetic: str) -> Dict[str, Any]:
+        text = next(self.recorded) if self.recorded else synthetic
+        return {"text": text, "tool_calls": [], "structured": None}
+
+    def _tool_call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        call = {"id": f"call_{name}_{next(self._call_ids)}", "name": name, "arguments": arguments}
+        return {"text": None, "tool_calls": [call], "structured": None}
+
+    def _planner(self, request, called, results):
+        query = request.strip().splitlines()[0][:200] if request.strip() else "research query"
+        sources = self.sources
+        plan = {
+            "original_query": query,
+            "research_goal": f"Survey {query}",
+            "topics": [
+                {
+                    "topic_id": f"topic_{i}",
+                    "query": f"{query} aspect {i}",
+                    "source": sources[i % len(sources)],
+                    "description": synthetic_text(query, 20),
+                }
+                for i in range(self.topics)
+            ],
+        }
+        return self._text(f"```json\n{json.dumps(plan, indent=2)}\n```")
+
+    def _coordinator(self, request, called, results):
+        if "send_to_agents_parallel" not in called:
+            plan = _extract_json(request) or {}
+            # One task per topic: the coordinator spreads them over the sub-agents' replicas
+            tasks = []
+            for topic in plan.get("topics", []):
+                source = topic.get("source") if topic.get("source") in self.agent_jids else "tavily"
+                tasks.append({"agent_id": self.agent_jids[source], "message": f"Research this topic:\n{topic.get('query', '')}"})
+            if not tasks:
+                tasks.append({"agent_id": self.agent_jids["tavily"], "message": f"Research this topic:\n{request[:200]}"})
+            return self._tool_call("send_to_agents_parallel", {"tasks": tasks})
+
+        if "complete_task" not in called:
+            return self._tool_call("complete_task", {})
+
+        findings = "\n\n".join(results[:-1])
+        return self._text(
+            f"Research Context\n\n{findings}\n\n{synthetic_text('research context', self.response_tokens)}\n\n<TASK_COMPLETE>"
+        )
+
+    def _search_agent(self, tool_name, request, called, results):
+        if tool_name not in called:
+            lines = [line for line in request.splitlines() if line.strip()]
+            query = lines[-1].strip() if lines else request
+            return self._tool_call(tool_name, {"query": query})
+        return self._text(f"Key findings:\n{results[-1][:2000]}\n\n{synthetic_text(request[:80], self.response_tokens)}")
+
+    def _tavily(self, request, called, results):
+        return self._search_agent("tavily_search", request, called, results)
+
+    def _arxiv(self, request, called, results):
+        return self._search_agent("search_local_papers", request, called, results)
+
+    def _wikipedia(self, request, called, results):
+        return self._search_agent("search_wikipedia", request, called, results)
+
+    def _writer(self, request, called, results):
+        # One section per researched topic, citing the sources listed in the prompt
+        sources = re.findall(r"^\s*\[(S\d+)\] \(\w+\).*? (\S+) \| (.*?):", request, re.MULTILINE)
+        topics: Dict[str, List[str]] = defaultdict(list)
+        for source_id, _, topic in sources:
+            topics[topic].append(source_id)
+        if not topics:
+            topics = {f"section {i}": [] for i in range(1, 5)}
+        size = self.response_tokens // (len(topics) + 1)
+        sections = "\n\n".join(
+            f"## {topic}\n\n{synthetic_text(topic, size)} {' '.join(f'[{i}]' for i in ids)}"
+            for topic, ids in topics.items()
+        )
+        references = "\n".join(f"- [{source_id}] {locator}" for source_id, locator, _ in sources)
+        return self._text(
+            f"# Research Report\n\n## Executive Summary\n\n{synthetic_text('summary', size)}\n\n{sections}"
+            f"\n\n## References\n\n{references}"
+        )
+
+    def _critic(self, request, called, results):
+        match = re.search(r"Original Query:\s*(.+)", request)
+        query = match.group(1).strip() if match else request[:200]
+        self._reviews[query] += 1
+        round_ = self._reviews[query]
+
+        if round_ <= self.critic_rounds:
+            review = {
+                "status": "INSUFFICIENT",
+                "feedback": synthetic_text("missing coverage", self.response_tokens // 2),
+                "missing_information": [f"{query[:80]} follow-up {round_}"],
+            }
+        else:
+            review = {"status": "SUFFICIENT", "feedback": "The report answers the query.", "missing_information": []}
+        return self._text(f"```json\n{json.dumps(review)}\n```")
+
+    def _summarizer(self, request, called, results):
+        return self._text(synthetic_text("summary", self.response_tokens))
+
+
+class MockTavilyClient:
+    """Stand-in for TavilyClient.search with a fixed latency and synthetic pages."""
+
+    def __init__(self, latency: float = 0.3, content_tokens: int = 1500, off_topic_every: int = 3):
+        """
+        Args:
+            latency: Seconds each search takes
+            content_tokens: Size of each result's raw_content, in tokens
+            off_topic_every: Every n-th result is about something else, as real searches return (0 = none)
+        """
+        self.latency = latency
+        self.content_tokens = content_tokens
+        self.off_topic_every = off_topic_every
+        self.searches = 0
+
+    def search(self, query: str, max_results: int = 3, **kwargs) -> Dict[str, Any]:
+        # Called through asyncio.to_thread, like the real client
+        time.sleep(self.latency)
+        self.searches += 1
+        slug = re.sub(r"\W+", "-", query.lower()).strip("-")[:60]
+        results = []
+        for i in range(1, max_results + 1):
+            subject = query
+            if self.off_topic_every and i % self.off_topic_every == 0:
+                subject = "unrelated vendor press release"
+            results.append({
+                "title": f"{subject} ({i})",
+                "url": f"https://example.org/{slug}/{i}",
+                "content": synthetic_text(subject, 60),
+                "raw_content": synthetic_text(subject, self.content_tokens),
+                "score": 1.0 / i,
+            })
+        return {"query": query, "results": results}
+
+
+def write_synthetic_papers(directory: str, count: int = 20, section_tokens: int = 400):
+    """
+    Write markdown papers for the local ArXiv index to find.
+
+    Args:
+        directory: Directory to write <id>.md files to
+        count: Number of papers
+        section_tokens: Size of each section, in tokens
+    """
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        paper_id = f"2401.{i:05d}"
+        sections = ["Abstract", "Introduction", "Method", "Experiments", "Conclusion"]
+        body = "\n\n".join(
+            f"## {title}\n\n{synthetic_text(f'{title.lower()} of paper {i}', section_tokens)}" for title in sections
+        )
+        with open(os.path.join(directory, f"{paper_id}.md"), "w") as f:
+            f.write(f"# Synthetic paper {i}\n\n{body}\n")
+
+
+def write_synthetic_wikipedia_dump(path: str, count: int = 200, section_tokens: int = 300):
+    """
+    Write a pages-articles XML dump for the local Wikipedia index to find.
+
+    Args:
+        path: Dump file to write
+        count: Number of articles (a talk page and a redirect are added as well)
+        section_tokens: Size of each section, in tokens
+    """
+    def page(title: str, text: str, ns: int = 0, redirect: bool = False) -> str:
+        redirect_tag = f'    <redirect title="{title}" />\n' if redirect else ""
+        return (
+            f"  <page>\n    <title>{title}</title>\n    <ns>{ns}</ns>\n{redirect_tag}"
+            f'    <revision>\n      <text xml:space="preserve">{text}</text>\n    </revision>\n  </page>\n'
+        )
+
+    with open(path, "w") as f:
+        f.write("<mediawiki>\n")
+        f.write(page("Talk:Synthetic article 0", "Discussion.", ns=1))
+        f.write(page("Synthetic alias", "#REDIRECT [[Synthetic article 0]]", redirect=True))
+        for i in range(count):
+            subject = _WORDS[i % len(_WORDS)]
+            lead = f"Synthetic article {i} is about [[{subject}]]. {synthetic_text(subject, section_tokens // 3)}"
+            body = "\n\n".join(
+                f"== {title} ==\n{synthetic_text(f'{title.lower()} of {subject}', section_tokens)}"
+                for title in ("History", "Overview", "Applications")
+            )
+            f.write(page(f"Synthetic article {i}", f"{lead}\n\n{body}"))
+        f.write("</mediawiki>\n")
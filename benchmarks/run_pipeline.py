@@ -0,0 +1,345 @@
+"""
+Offline end-to-end benchmark of the deep research pipeline.
+
+Runs the full DeepResearchAgent FSM (planning, research, writing and the
+critic feedback loop) against mock LLM providers and a mock Tavily client,
+on an in-process message bus, so no Ollama, Tavily or XMPP server is needed.
+Reports wall-clock time per FSM stage, messages, LLM calls and peak memory
+for a single session and for concurrent sessions.
+
+Usage:
+    python -m benchmarks.run_pipeline --sessions 1,4 --critic-rounds 1
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import spade
+from slixmpp import JID
+from src.agents import (
+    ArXivAgent,
+    TavilyAgent,
+    WikipediaAgent,
+    PlannerAgent,
+    WriterAgent,
+    CriticAgent,
+    ResearchCoordinatorAgent,
+    create_replicas,
+)
+from src.agent import DeepResearchAgent
+from src.config.settings import settings
+from src.utils.local_bus import LocalMessageBus
+from src.utils.paper_index import PaperIndex
+from src.utils.replicas import ReplicaPool
+from src.utils.wiki_index import WikiIndex
+from src.utils.startup import AgentLauncher
+from src.utils.tracing import tracer, TracedProvider
+from src.utils.budget import MeteredProvider
+from benchmarks.mocks import (
+    ROLES,
+    MockLLMProvider,
+    MockTavilyClient,
+    write_synthetic_papers,
+    write_synthetic_wikipedia_dump,
+)
+
+logger = logging.getLogger(__name__)
+
+DOMAIN = "bench.local"
+PASSWORD = "benchmark"
+
+
+async def auto_approve(prompt: str) -> str:
+    return "y"
+
+
+def load_recordings(path: Optional[str]) -> Dict[str, List[str]]:
+    """
+    Load recorded responses: a JSON object mapping a role to a list of response texts.
+    """
+    if not path:
+        return {}
+    with open(path) as f:
+        recordings = json.load(f)
+    unknown = set(recordings) - set(ROLES)
+    if unknown:
+        raise ValueError(f"Unknown roles in {path}: {sorted(unknown)}")
+    return recordings
+
+
+class PipelineBenchmark:
+    """Builds the agent system with mock providers and runs research sessions through it."""
+
+    def __init__(self, args: argparse.Namespace, papers_dir: str, wiki_index: Optional[WikiIndex] = None):
+        self.args = args
+        self.papers_dir = papers_dir
+        self.wiki_index = wiki_index
+        self.recordings = load_recordings(args.recorded)
+        self.providers: Dict[str, MockLLMProvider] = {}
+        self.pools: List[ReplicaPool] = []
+
+    def provider(self, role: str, agent_name: str, **kwargs) -> MeteredProvider:
+        mock = MockLLMProvider(
+            role,
+            latency=self.args.latency,
+            tokens_per_second=self.args.tokens_per_second,
+            topics=self.args.topics,
+            critic_rounds=self.args.critic_rounds,
+            recorded=self.recordings.get(role),
+            **kwargs,
+        )
+        self.providers[agent_name] = mock
+        return MeteredProvider(TracedProvider(mock, agent_name), agent_name)
+
+    def create_shared_agents(self, tavily_client: MockTavilyClient) -> List[Any]:
+        """Sub-agents, planner, writer and critic are shared by all sessions, as in a deployment."""
+        arxiv_index = PaperIndex(self.papers_dir, os.path.join(self.papers_dir, "index.sqlite3"))
+        arxiv_agents, arxiv_pool = create_replicas(
+            ArXivAgent, f"arxiv@{DOMAIN}", self.args.replicas, PASSWORD,
+            lambda name: self.provider("arxiv", name),
+            mcp_servers=[], paper_index=arxiv_index,
+        )
+        tavily_agents, tavily_pool = create_replicas(
+            TavilyAgent, f"tavily@{DOMAIN}", self.args.replicas, PASSWORD,
+            lambda name: self.provider("tavily", name),
+            summary_provider=self.provider("summarizer", "summarizer"),
+            tavily_client=tavily_client,
+        )
+        research_agents = [*arxiv_agents, *tavily_agents]
+        self.pools = [tavily_pool, arxiv_pool]
+        if self.wiki_index is not None:
+            wikipedia_agents, wikipedia_pool = create_replicas(
+                WikipediaAgent, f"wikipedia@{DOMAIN}", self.args.replicas, PASSWORD,
+                lambda name: self.provider("wikipedia", name),
+                wiki_index=self.wiki_index,
+            )
+            research_agents += wikipedia_agents
+            self.pools.append(wikipedia_pool)
+        sources = [JID(pool.name).local for pool in self.pools]
+        return [
+            *research_agents,
+            PlannerAgent(f"planner@{DOMAIN}", PASSWORD, self.provider("planner", "planner", sources=sources)),
+            WriterAgent(f"writer@{DOMAIN}", PASSWORD, self.provider("writer", "writer")),
+            CriticAgent(f"critic@{DOMAIN}", PASSWORD, self.provider("critic", "critic")),
+        ]
+
+    def create_session_agents(self, session: int):
+        """A coordinator serves one research run at a time, so each session gets its own."""
+        subagents = {JID(pool.name).local: pool.name for pool in self.pools}
+        coordinator_jid = f"coordinator{session}@{DOMAIN}"
+        coordinator = ResearchCoordinatorAgent(
+            jid=coordinator_jid,
+            password=PASSWORD,
+            subagent_ids=list(subagents.values()),
+            pools=self.pools,
+            provider=self.provider("coordinator", f"coordinator{session}", agent_jids=subagents),
+        )
+        orchestrator = DeepResearchAgent(
+            jid=f"orchestrator{session}@{DOMAIN}",
+            password=PASSWORD,
+            user_query=f"{self.args.query} (session {session})",
+            planner_jid=f"planner@{DOMAIN}",
+            coordinator_jid=coordinator_jid,
+            writer_jid=f"writer@{DOMAIN}",
+            critic_jid=f"critic@{DOMAIN}",
+            input_func=auto_approve,
+            export_trace=False,
+            token_budget_soft=self.args.soft_budget,
+            token_budget_hard=self.args.hard_budget,
+        )
+        return coordinator, orchestrator
+
+    async def run_scenario(self, sessions: int) -> Dict[str, Any]:
+        """
+        Run a number of research sessions concurrently on a fresh agent system.
+
+        Args:
+            sessions: Number of concurrent sessions
+
+        Returns:
+            Metrics for the scenario
+        """
+        self.providers = {}
+        tracer.clear()
+        bus = LocalMessageBus()
+        launcher = AgentLauncher(timeout=self.args.startup_timeout, bus=bus)
+        tavily_client = MockTavilyClient(latency=self.args.search_latency)
+
+        await launcher.start(*self.create_shared_agents(tavily_client))
+        coordinators, orchestrators = zip(*(self.create_session_agents(i) for i in range(1, sessions + 1)))
+        await launcher.start(*coordinators)
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        started_at = time.perf_counter()
+        with self._output():
+            await launcher.start(*orchestrators)
+            session_times = await asyncio.gather(*(self._wait_for(o, started_at) for o in orchestrators))
+        wall_time = time.perf_counter() - started_at
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Give the end-of-run release messages time to arrive
+        await asyncio.sleep(0.5)
+        retained = sum(len(agent.context._conversations) for agent in launcher.agents if hasattr(agent, "context"))
+
+        await launcher.stop()
+
+        completed = [o for o, t in zip(orchestrators, session_times) if t is not None and o.current_report]
+        return {
+            "sessions": sessions,
+            "completed": len(completed),
+            "wall_time_s": round(wall_time, 3),
+            "session_time_s": [round(t, 3) if t is not None else None for t in session_times],
+            "session_tokens": [o.run_usage.total_tokens if o.run_usage else None for o in orchestrators],
+            "stages": self._stage_stats(),
+            "llm": self._llm_stats(),
+            "tools": self._tool_stats(),
+            "messages": {"count": bus.messages_delivered, "bytes": bus.bytes_delivered},
+            "tavily_searches": tavily_client.searches,
+            "peak_memory_mb": round(peak_memory / 2**20, 2),
+            "retained_conversations": retained,
+        }
+
+    async def _wait_for(self, orchestrator: DeepResearchAgent, started_at: float) -> Optional[float]:
+        try:
+            await orchestrator.fsm.join(timeout=self.args.session_timeout)
+        except TimeoutError:
+            logger.error(f"Session {orchestrator.jid} did not finish within {self.args.session_timeout}s")
+            return None
+        return time.perf_counter() - started_at
+
+    def _output(self):
+        # States print plans and reports to stdout; keep the benchmark output readable
+        if self.args.verbose:
+            return contextlib.nullcontext()
+        return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+    def _stage_stats(self) -> Dict[str, Dict[str, float]]:
+        durations: Dict[str, List[float]] = defaultdict(list)
+        for span in tracer.spans:
+            if span.category == "state":
+                durations[span.name].append(span.duration_us / 1000)
+        return {
+            name: {
+                "visits": len(values),
+                "total_ms": round(sum(values), 1),
+                "mean_ms": round(sum(values) / len(values), 1),
+                "max_ms": round(max(values), 1),
+            }
+            for name, values in durations.items()
+        }
+
+    def _llm_stats(self) -> Dict[str, Dict[str, float]]:
+        stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for span in tracer.spans:
+            if span.category == "llm":
+                agent = stats[span.track]
+                agent["calls"] += 1
+                agent["time_ms"] += span.duration_us / 1000
+                agent["prompt_tokens"] += span.attributes.get("prompt_tokens", 0)
+                agent["completion_tokens"] += span.attributes.get("completion_tokens", 0)
+        return {name: {k: round(v, 1) for k, v in values.items()} for name, values in sorted(stats.items())}
+
+    def _tool_stats(self) -> Dict[str, Dict[str, float]]:
+        stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for span in tracer.spans:
+            if span.category == "tool":
+                tool = stats[span.name]
+                tool["calls"] += 1
+                tool["time_ms"] += span.duration_us / 1000
+        return {name: {k: round(v, 1) for k, v in values.items()} for name, values in sorted(stats.items())}
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"\n=== {result['sessions']} session(s): {result['completed']} completed in {result['wall_time_s']:.2f}s ===")
+    print(f"Session times (s): {result['session_time_s']}")
+    print(f"Session tokens: {result['session_tokens']}")
+    print(f"Messages: {result['messages']['count']} ({result['messages']['bytes']} bytes)")
+    print(f"Tavily searches: {result['tavily_searches']}")
+    print(f"Peak traced memory: {result['peak_memory_mb']} MB")
+    print(f"Conversations still held after the runs: {result['retained_conversations']}")
+
+    print(f"\n{'Stage':<30}{'visits':>8}{'total ms':>12}{'mean ms':>12}{'max ms':>12}")
+    for name, stats in result["stages"].items():
+        print(f"{name:<30}{stats['visits']:>8}{stats['total_ms']:>12}{stats['mean_ms']:>12}{stats['max_ms']:>12}")
+
+    print(f"\n{'LLM agent':<30}{'calls':>8}{'time ms':>12}{'prompt tok':>12}{'compl tok':>12}")
+    for name, stats in result["llm"].items():
+        print(
+            f"{name:<30}{int(stats['calls']):>8}{stats['time_ms']:>12}"
+            f"{int(stats['prompt_tokens']):>12}{int(stats['completion_tokens']):>12}"
+        )
+
+    print(f"\n{'Tool':<30}{'calls':>8}{'time ms':>12}")
+    for name, stats in result["tools"].items():
+        print(f"{name:<30}{int(stats['calls']):>8}{stats['time_ms']:>12}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the deep research pipeline")
+    parser.add_argument("--sessions", default="1,4", help="Comma-separated concurrent session counts to run (default: 1,4)")
+    parser.add_argument("--query", default="Recent advances in retrieval-augmented generation", help="Research query")
+    parser.add_argument("--topics", type=int, default=3, help="Topics per research plan")
+    parser.add_argument("--critic-rounds", type=int, default=1, help="Critic rejections per session before approval; above 0 implies --no-precheck, which would pass the mock drafts without the critic")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock LLM time to first token, in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Mock LLM generation speed")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="Mock Tavily search latency, in seconds")
+    parser.add_argument("--replicas", type=int, default=1, help="Replicas of each research sub-agent")
+    parser.add_argument("--wikipedia", type=int, default=0, help="Articles in a synthetic Wikipedia dump for a Wikipedia sub-agent (0 = no Wikipedia agent)")
+    parser.add_argument("--papers", type=int, default=20, help="Synthetic papers in the local ArXiv index")
+    parser.add_argument("--soft-budget", type=int, default=0, help="Soft token budget per session (0 = none)")
+    parser.add_argument("--hard-budget", type=int, default=0, help="Hard token budget per session (0 = none)")
+    parser.add_argument("--no-precheck", action="store_true", help="Send every draft to the critic LLM (disables REPORT_PRECHECK_ENABLED); implied by --critic-rounds above 0")
+    parser.add_argument("--recorded", help="JSON file mapping roles to recorded responses to replay")
+    parser.add_argument("--startup-timeout", type=float, default=10.0, help="Agent startup timeout, in seconds")
+    parser.add_argument("--session-timeout", type=float, default=300.0, help="Timeout for each session, in seconds")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace):
+    tracer.enabled = True
+    # The mock drafts pass the pre-check, which would skip the critic rounds
+    if args.no_precheck or args.critic_rounds > 0:
+        settings.REPORT_PRECHECK_ENABLED = False
+    results = []
+    with tempfile.TemporaryDirectory() as papers_dir:
+        write_synthetic_papers(papers_dir, count=args.papers)
+        # Keep claim-check blobs out of the working directory
+        settings.BLOB_STORE_DIR = os.path.join(papers_dir, "blobs")
+        wiki_index = None
+        if args.wikipedia:
+            dump_path = os.path.join(papers_dir, "wikipedia.xml")
+            write_synthetic_wikipedia_dump(dump_path, count=args.wikipedia)
+            wiki_index = WikiIndex(dump_path, os.path.join(papers_dir, "wikipedia_index"))
+            wiki_index.build()
+        benchmark = PipelineBenchmark(args, papers_dir, wiki_index)
+        for sessions in (int(n) for n in args.sessions.split(",")):
+            result = await benchmark.run_scenario(sessions)
+            print_report(result)
+            results.append(result)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if arguments.verbose else logging.ERROR,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr,
+    )
+    spade.run(main(arguments))
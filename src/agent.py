@@ -1,10 +1,22 @@
-from typing import Optional
+from typing import Callable, Optional
+import os
+import asyncio
+import uuid
 import logging
+from dataclasses import asdict
+from datetime import datetime
 import spade
 from spade.agent import Agent
 from spade.behaviour import FSMBehaviour, CyclicBehaviour
 from spade.message import Message
 from spade.template import Template
+from src.config.settings import settings
+from src.utils.tracing import tracer
+from src.utils.budget import ledger
+from src.utils.context import release_message
+from src.utils.approval import ApprovalPolicy
+from src.utils.evidence import evidence_registry
+from src.utils.blob_store import get_blob_store
 from src.states import (
     DraftPlanState,
     WaitForUserValidationState,
@@ -26,14 +38,13 @@ class ChatListenerBehaviour(CyclicBehaviour):
             query = msg.body.strip()
             
             if query:
-                self.agent.user_query = query
-                self.agent.initial_query = query
-                self.agent.chat_sender = str(msg.sender)
-                
-                # Check if FSM is already running
+                # Check if FSM is already running: replies from internal agents also reach this listener
                 if self.agent.fsm is not None and self.agent.fsm.is_running:
                     logger.warning("[ChatListener] FSM already running, ignoring message from internal agent")
                 else:
+                    self.agent.user_query = query
+                    self.agent.initial_query = query
+                    self.agent.chat_sender = str(msg.sender)
                     logger.info(f"[ChatListener] Starting FSM for query: {query}")
                     await self.agent.start_research_workflow()
 
@@ -51,6 +62,27 @@ class DeepResearchFSMBehaviour(FSMBehaviour):
                 msg.set_metadata("message_type", "llm")
                 await self.send(msg)
                 logger.info("[FSM] Sent final report to chat sender")
+        
+        evidence_registry.close_run(self.agent.run_id)
+        await asyncio.to_thread(get_blob_store().evict)
+        for gain in self.agent.research_gains:
+            logger.info(f"[FSM] Research gain: {asdict(gain)}")
+        run = ledger.close_run(self.agent.run_id)
+        if run is not None:
+            self.agent.run_usage = run
+            summary = ledger.format_summary(run)
+            logger.info(f"[FSM] {summary}")
+            self.agent.output_func(f"\n{summary}")
+        
+        # Let the agents free this run's conversations
+        for jid in (self.agent.planner_jid, self.agent.coordinator_jid, self.agent.writer_jid, self.agent.critic_jid):
+            await self.send(release_message(jid, self.agent.run_id))
+        
+        if self.agent.export_trace:
+            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            trace_prefix = tracer.export(os.path.join(settings.TRACE_DIR, f"{self.agent.name}_{timestamp}"))
+            if trace_prefix:
+                logger.info(f"[FSM] Trace written to {trace_prefix}.jsonl and {trace_prefix}.trace.json")
         # Don't stop the agent - keep it ready for new requests
 
 class DeepResearchAgent(Agent):
@@ -64,6 +96,12 @@ class DeepResearchAgent(Agent):
         writer_jid: str,
         critic_jid: str,
         input_func=None,
+        approval_policy: Optional[ApprovalPolicy] = None,
+        output_func: Optional[Callable[..., None]] = None,
+        listen_for_chat: bool = True,
+        export_trace: bool = True,
+        token_budget_soft: Optional[int] = None,
+        token_budget_hard: Optional[int] = None,
         **kwargs
     ):
         super().__init__(jid, password, **kwargs)
@@ -74,13 +112,36 @@ class DeepResearchAgent(Agent):
         self.writer_jid = writer_jid
         self.critic_jid = critic_jid
         self.input_func = input_func if input_func else input
+        # With an approval policy, plans are validated without asking the user
+        self.approval_policy = approval_policy
+        self.output_func = output_func if output_func else print
+        # Disable for headless runs, where stray replies must not start a new workflow
+        self.listen_for_chat = listen_for_chat
+        # Disable when several orchestrators share the process-wide tracer
+        self.export_trace = export_trace
+        self.token_budget_soft = settings.TOKEN_BUDGET_SOFT if token_budget_soft is None else token_budget_soft
+        self.token_budget_hard = settings.TOKEN_BUDGET_HARD if token_budget_hard is None else token_budget_hard
         
         # Shared Data
         self.current_plan = None
         self.research_context = None
+        # EvidenceStore of the current run; tools fill it, states read it
+        self.evidence = None
+        # Topics of every plan executed in the run, for the report pre-check
+        self.research_topics = []
+        self.report_check = None
+        self.report_feedback = None
+        self.report_rewrites = 0
+        # IterationGain per research iteration, for convergence detection and tuning
+        self.research_gains = []
+        self.evidence_mark = None
+        self.previous_report = None
         self.current_report = None
         self.chat_sender = None
         self.fsm = None
+        self.run_id = None
+        self.run_usage = None
+        self.plan_revisions = 0
 
     async def start_research_workflow(self):
         """Start a new FSM workflow for research"""
@@ -96,12 +157,29 @@ class DeepResearchAgent(Agent):
         self.current_plan = None
         self.research_context = None
         self.current_report = None
+        self.plan_revisions = 0
+        self.research_topics = []
+        self.report_check = None
+        self.report_feedback = None
+        self.report_rewrites = 0
+        self.research_gains = []
+        self.evidence_mark = None
+        self.previous_report = None
+        self.run_usage = None
+        
+        if self.run_id:
+            ledger.close_run(self.run_id)
+            evidence_registry.close_run(self.run_id)
+        # Every request of the run carries a thread id prefixed with run_id, for token accounting
+        self.run_id = f"{self.name}-{uuid.uuid4().hex[:8]}"
+        ledger.open_run(self.run_id, self.token_budget_soft, self.token_budget_hard)
+        self.evidence = evidence_registry.open_run(self.run_id, settings.EVIDENCE_SUMMARY_MAX_CHARS)
         
         # Create and start new FSM
         self.fsm = DeepResearchFSMBehaviour()
         self._setup_fsm(self.fsm)
         self.add_behaviour(self.fsm)
-        logger.info("[DeepResearchAgent] Started new FSM workflow")
+        logger.info(f"[DeepResearchAgent] Started new FSM workflow (run {self.run_id})")
 
     def _setup_fsm(self, fsm):
         """Configure FSM states and transitions"""
@@ -127,21 +205,27 @@ class DeepResearchAgent(Agent):
         # Writing Phase
         fsm.add_transition(source=DraftReportState.NAME, dest=ReviewReportState.NAME)
         fsm.add_transition(source=DraftReportState.NAME, dest=DraftReportState.NAME)  # Retry loop
+        fsm.add_transition(source=ReviewReportState.NAME, dest=DraftReportState.NAME)  # Rewrite after a failed pre-check
         
         fsm.add_transition(source=ReviewReportState.NAME, dest=FinalOutputState.NAME)
         fsm.add_transition(source=ReviewReportState.NAME, dest=FinalOutputState.NAME)  # Fail open path
         
         # Feedback Loop (Critic -> Research)
         fsm.add_transition(source=ReviewReportState.NAME, dest=ResearchExecutionState.NAME)
+        
+        # Token budget exits
+        for state_name in (DraftPlanState.NAME, WaitForUserValidationState.NAME, ResearchExecutionState.NAME, DraftReportState.NAME):
+            fsm.add_transition(source=state_name, dest=FinalOutputState.NAME)
 
     async def setup(self):
         logger.info("DeepResearchAgent starting...")
         
         # Add chat listener behaviour
-        chat_listener = ChatListenerBehaviour()
-        template = Template()
-        template.set_metadata("message_type", "llm")
-        self.add_behaviour(chat_listener, template)
+        if self.listen_for_chat:
+            chat_listener = ChatListenerBehaviour()
+            template = Template()
+            template.set_metadata("message_type", "llm")
+            self.add_behaviour(chat_listener, template)
         
         # If initial query provided, start FSM
         if self.initial_query:
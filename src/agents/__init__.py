@@ -1,15 +1,21 @@
 from .specialized import (
     ArXivAgent,
     TavilyAgent,
+    WikipediaAgent,
     PlannerAgent,
     WriterAgent,
     CriticAgent,
+    ResearchCoordinatorAgent,
+    create_replicas,
 )
 
 __all__ = [
     "ArXivAgent",
     "TavilyAgent",
+    "WikipediaAgent",
     "PlannerAgent",
     "WriterAgent",
     "CriticAgent",
+    "ResearchCoordinatorAgent",
+    "create_replicas",
 ]
@@ -1,58 +1,397 @@
-from typing import Optional
-from spade_llm.agent import LLMAgent
+import uuid
+import asyncio
+import logging
+import contextvars
+from typing import Dict, List, Optional, Tuple
+from slixmpp import JID
+from spade.message import Message
+from spade_llm.agent import LLMAgent, CoordinatorAgent
 from spade_llm.providers import LLMProvider
 from src.config import prompts
 from src.config.mcp import get_arxiv_mcp_config
-from src.config.tools import create_tavily_search_tool
+from src.config.settings import settings
+from src.config.schemas import ResearchPlan, CriticReview
+from src.config.tools import (
+    create_tavily_search_tool,
+    create_local_paper_search_tool,
+    create_paper_section_reader_tool,
+    create_wikipedia_search_tool,
+    create_wikipedia_section_reader_tool,
+    get_wiki_index,
+)
+from src.utils.paper_index import PaperIndex
+from src.utils.tracing import TracedToolsMixin
+from src.utils.context import RunReleaseMixin, create_context_management, release_message
+from src.utils.blob_store import ResolveBlobsGuardrail, ClaimCheckGuardrail
+from src.utils.replicas import ReplicaPool, replica_jids
 
-class ArXivAgent(LLMAgent):
-    def __init__(self, jid: str, password: str, provider: LLMProvider, **kwargs):
+logger = logging.getLogger(__name__)
+
+COORDINATION_SUFFIX = ":coordination"
+
+# Sub-agent session of the message LLMBehaviour is processing. LLMBehaviour
+# handles one message at a time in its own task and calls set_conversation_id
+# on the tools before running that message's tool calls, so the value is set
+# once per message, lasts until the next one, and is what the delegation
+# tools of the message read.
+_coordination_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("coordination_session", default=None)
+
+def _compacting(kwargs):
+    """Default agents with a long-lived conversation to token-based history compaction."""
+    kwargs.setdefault(
+        "context_management",
+        create_context_management(settings.CONTEXT_MAX_TOKENS, settings.CONTEXT_MAX_MESSAGE_TOKENS),
+    )
+    return kwargs
+
+def _claim_checked(kwargs, responses: bool = False):
+    """Resolve claim checks in incoming messages and, if responses is set, send large responses as claim checks."""
+    kwargs["input_guardrails"] = [ResolveBlobsGuardrail(), *(kwargs.get("input_guardrails") or [])]
+    if responses:
+        kwargs["output_guardrails"] = [*(kwargs.get("output_guardrails") or []), ClaimCheckGuardrail()]
+    return kwargs
+
+def _structured(kwargs, schema):
+    """Ask providers that support it for schema-constrained JSON output."""
+    if settings.STRUCTURED_OUTPUT:
+        kwargs.setdefault("output_schema", schema)
+    return kwargs
+
+class ArXivAgent(RunReleaseMixin, TracedToolsMixin, LLMAgent):
+    def __init__(self, jid: str, password: str, provider: LLMProvider, mcp_servers=None, paper_index=None, **kwargs):
+        if mcp_servers is None:
+            mcp_servers = [get_arxiv_mcp_config()]
+        if paper_index is None:
+            paper_index = PaperIndex(settings.ARXIV_STORAGE_PATH, settings.ARXIV_INDEX_PATH)
         super().__init__(
             jid=jid,
             password=password,
             provider=provider,
             system_prompt=prompts.ARXIV_AGENT_PROMPT,
-            mcp_servers=[get_arxiv_mcp_config()],
-            **kwargs
+            mcp_servers=mcp_servers,
+            tools=[
+                create_local_paper_search_tool(paper_index),
+                create_paper_section_reader_tool(paper_index),
+            ],
+            **_compacting(kwargs)
         )
+        self.paper_index = paper_index
 
-class TavilyAgent(LLMAgent):
-    def __init__(self, jid: str, password: str, provider: LLMProvider, summary_provider=None, **kwargs):
+    async def setup(self):
+        await super().setup()
+        # Papers stored before the agent started; later downloads are indexed one by one
+        await asyncio.to_thread(self.paper_index.refresh)
+
+    def _register_tool(self, tool):
+        if tool.name == "download_paper":
+            self._index_downloads(tool)
+        super()._register_tool(tool)
+
+    def _index_downloads(self, tool):
+        """Index each paper the ArXiv MCP server downloads, so searches need not scan the storage directory."""
+        execute = tool.execute
+
+        async def download_and_index(**kwargs):
+            result = await execute(**kwargs)
+            if kwargs.get("paper_id"):
+                await asyncio.to_thread(self.paper_index.refresh_paper, str(kwargs["paper_id"]))
+            return result
+
+        tool.execute = download_and_index
+
+class TavilyAgent(RunReleaseMixin, TracedToolsMixin, LLMAgent):
+    def __init__(self, jid: str, password: str, provider: LLMProvider, summary_provider=None, tavily_client=None, **kwargs):
         super().__init__(
             jid=jid,
             password=password,
             provider=provider,
             system_prompt=prompts.TAVILY_AGENT_PROMPT,
-            tools=[create_tavily_search_tool(summary_provider=summary_provider)],
-            **kwargs
+            tools=[create_tavily_search_tool(summary_provider=summary_provider, client=tavily_client)],
+            **_compacting(kwargs)
         )
 
-class PlannerAgent(LLMAgent):
+class WikipediaAgent(RunReleaseMixin, TracedToolsMixin, LLMAgent):
+    def __init__(self, jid: str, password: str, provider: LLMProvider, wiki_index=None, **kwargs):
+        if wiki_index is None:
+            wiki_index = get_wiki_index()
+        super().__init__(
+            jid=jid,
+            password=password,
+            provider=provider,
+            system_prompt=prompts.WIKIPEDIA_AGENT_PROMPT,
+            tools=[
+                create_wikipedia_search_tool(wiki_index),
+                create_wikipedia_section_reader_tool(wiki_index),
+            ],
+            **_compacting(kwargs)
+        )
+
+class PlannerAgent(RunReleaseMixin, LLMAgent):
     def __init__(self, jid: str, password: str, provider: LLMProvider, **kwargs):
         super().__init__(
             jid=jid,
             password=password,
             provider=provider,
             system_prompt=prompts.PLANNER_SYSTEM_PROMPT,
-            **kwargs
+            **_structured(kwargs, ResearchPlan)
         )
 
-class WriterAgent(LLMAgent):
+class WriterAgent(RunReleaseMixin, LLMAgent):
     def __init__(self, jid: str, password: str, provider: LLMProvider, **kwargs):
         super().__init__(
             jid=jid,
             password=password,
             provider=provider,
             system_prompt=prompts.WRITER_SYSTEM_PROMPT,
-            **kwargs
+            **_claim_checked(kwargs, responses=True)
         )
 
-class CriticAgent(LLMAgent):
+class CriticAgent(RunReleaseMixin, LLMAgent):
     def __init__(self, jid: str, password: str, provider: LLMProvider, **kwargs):
         super().__init__(
             jid=jid,
             password=password,
             provider=provider,
             system_prompt=prompts.CRITIC_SYSTEM_PROMPT,
-            **kwargs
+            **_claim_checked(_structured(kwargs, CriticReview))
         )
+
+def create_replicas(agent_class, jid: str, count: int, password: str, provider_for, **kwargs) -> Tuple[List[LLMAgent], ReplicaPool]:
+    """
+    Create the replicas of a sub-agent and the pool a coordinator dispatches to.
+
+    Every replica is a separate agent with its own JID (see replica_jids),
+    provider and tool sessions (e.g. its own ArXiv MCP server).
+
+    Args:
+        agent_class: Sub-agent class, e.g. TavilyAgent
+        jid: Sub-agent id the coordinator's LLM addresses; also the pool name
+        count: Number of replicas
+        provider_for: Function returning the provider for a replica name (local part of its JID)
+        **kwargs: Passed to every replica, e.g. a shared paper_index
+
+    Returns:
+        (replicas, pool)
+    """
+    jids = replica_jids(jid, count)
+    agents = [agent_class(replica, password, provider_for(JID(replica).local), **kwargs) for replica in jids]
+    return agents, ReplicaPool(jid, jids)
+
+class ResearchCoordinatorAgent(RunReleaseMixin, TracedToolsMixin, CoordinatorAgent):
+    """
+    CoordinatorAgent whose delegation tools (the hops to sub-agents) are traced.
+
+    The sub-agent session is derived from the conversation of the request
+    being served ("<conversation>:coordination"), so sub-agent work is
+    attributed to the research run that caused it and every run starts
+    with empty sub-agent histories. The session is kept in a context
+    variable of the behaviour's task, set for each message it processes
+    (see _coordination_session), and not written to the agent: tasks
+    already sent keep their own session with them, so a run's replies are
+    recorded under its session even after another run's message has been
+    processed. Releasing a run is forwarded to the sub-agents.
+
+    Each sub-agent id may stand for a pool of replicas. Tasks addressed to
+    it go to an idle replica, or wait in the pool's queue until one is
+    free, so several tasks for the same sub-agent run side by side. Every
+    task is sent on its own thread ("<session>:<task id>"), which the
+    replica's reply carries back, so replies are matched to tasks by
+    thread rather than by sender and a late reply to an abandoned task is
+    never taken for the answer to a newer one. A replica whose task timed
+    out is not handed new tasks until that late reply arrives.
+    """
+
+    def __init__(self, *args, pools: Optional[List[ReplicaPool]] = None, **kwargs):
+        """
+        Args:
+            pools: Replica pools, named after the sub-agent ids they serve. Sub-agents without a pool get a single-replica one.
+        """
+        super().__init__(*args, **_compacting(kwargs))
+        self.pools: Dict[str, ReplicaPool] = {pool.name: pool for pool in pools or []}
+        for subagent_id in list(self.subagent_ids):
+            self.pools.setdefault(subagent_id, ReplicaPool(subagent_id, [subagent_id]))
+        self._pool_of: Dict[str, ReplicaPool] = {}
+        for pool in self.pools.values():
+            for replica in pool.replicas:
+                self._pool_of[replica] = pool
+        # Shared with the context manager and the routing function, which must recognize replica replies
+        self.subagent_ids.update(self._pool_of)
+        # Task thread -> (reply future, coordination session of the task)
+        self._awaiting: Dict[str, Tuple[asyncio.Future, str]] = {}
+        # Threads of tasks given up on (timed out or cancelled) -> (pool, replica still working on it, cooldown)
+        self._abandoned: Dict[str, Tuple[ReplicaPool, str, asyncio.TimerHandle]] = {}
+
+    def _register_tool(self, tool):
+        if tool.name in ("send_to_agent", "send_to_agents_parallel"):
+            # LLMBehaviour passes the current conversation id to tools that accept it
+            tool.set_conversation_id = self._scope_coordination_session
+        super()._register_tool(tool)
+
+    def _scope_coordination_session(self, conversation_id: Optional[str]):
+        if not conversation_id:
+            # Do not keep the previous message's session
+            _coordination_session.set(None)
+            return
+        if not conversation_id.endswith(COORDINATION_SUFFIX):
+            conversation_id = f"{conversation_id}{COORDINATION_SUFFIX}"
+        _coordination_session.set(conversation_id)
+
+    @property
+    def current_coordination_session(self) -> str:
+        """Sub-agent session of the message being processed, or the agent's default one if it has no conversation."""
+        return _coordination_session.get() or self.coordination_session
+
+    def _create_send_to_agent_tool(self):
+        tool = super()._create_send_to_agent_tool()
+
+        async def send_to_agent(agent_id: str, message: str) -> str:
+            if self._pool_for(agent_id) is None:
+                return f"Error: {agent_id} is not a registered subagent"
+            (response,) = await self._delegate([(agent_id, message)])
+            return response
+
+        tool.func = send_to_agent
+        return tool
+
+    def _create_send_to_agents_parallel_tool(self):
+        tool = super()._create_send_to_agents_parallel_tool()
+        tool.description += " Several tasks may go to the same subagent; they are spread over its replicas."
+
+        async def send_to_agents_parallel(tasks: List[Dict[str, str]]) -> str:
+            invalid_agents = [task.get("agent_id", "") for task in tasks if self._pool_for(task.get("agent_id", "")) is None]
+            if invalid_agents:
+                return f"Error: {', '.join(invalid_agents)} are not registered subagents"
+            logger.info(f"Sending parallel tasks to {len(tasks)} agents...")
+            responses = await self._delegate([(task["agent_id"], task.get("message", "")) for task in tasks])
+            return "\n\n".join(responses)
+
+        tool.func = send_to_agents_parallel
+        return tool
+
+    def _create_list_subagents_tool(self):
+        tool = super()._create_list_subagents_tool()
+
+        def list_subagents() -> str:
+            lines = [f"- {name}: {pool.status()}" for name, pool in self.pools.items()]
+            return f"Subagents in coordination session '{self.current_coordination_session}':\n" + "\n".join(lines)
+
+        tool.func = list_subagents
+        return tool
+
+    def _pool_for(self, agent_id: str) -> Optional[ReplicaPool]:
+        return self.pools.get(agent_id) or self._pool_of.get(agent_id)
+
+    async def _delegate(self, tasks: List[Tuple[str, str]]) -> List[str]:
+        """
+        Run tasks on replicas of their sub-agents and collect the replies.
+
+        Replies are read from the mailbox here, before LLMBehaviour sees
+        them, as CoordinatorAgent's own tools do.
+
+        Returns:
+            One "Response from <agent>: ..." entry per task, in task order
+        """
+        dispatches = [asyncio.ensure_future(self._dispatch(agent_id, message)) for agent_id, message in tasks]
+        try:
+            while not all(dispatch.done() for dispatch in dispatches):
+                response_msg = await self.llm_behaviour.receive(timeout=0.1)
+                if response_msg:
+                    self._collect(response_msg)
+        finally:
+            for dispatch in dispatches:
+                dispatch.cancel()
+        return [dispatch.result() for dispatch in dispatches]
+
+    async def _dispatch(self, agent_id: str, message: str) -> str:
+        pool = self._pool_for(agent_id)
+        replica = await pool.acquire()
+        session = self.current_coordination_session
+        thread = f"{session}:{uuid.uuid4().hex[:8]}"
+        abandoned = False
+        try:
+            reply = asyncio.get_running_loop().create_future()
+            self._awaiting[thread] = (reply, session)
+            msg = Message(to=replica)
+            msg.set_metadata("message_type", "llm")
+            msg.set_metadata("coordination_session", session)
+            msg.thread = thread
+            msg.body = message
+            await self.llm_behaviour.send(msg)
+            self.agent_status[pool.name] = "working"
+            logger.info(f"Sent task for {pool.name} to {replica} ({pool.status()})")
+            try:
+                body = await asyncio.wait_for(reply, self.subagent_response_timeout)
+            except asyncio.TimeoutError:
+                abandoned = self._abandon(thread, pool, replica)
+                self.agent_status[pool.name] = "timeout"
+                logger.warning(f"Timeout waiting for response from {replica} (>{self.subagent_response_timeout}s)")
+                return f"Response from {pool.name}: Error: did not respond within {self.subagent_response_timeout} seconds"
+            except asyncio.CancelledError:
+                abandoned = self._abandon(thread, pool, replica)
+                raise
+            return f"Response from {pool.name}: {body}"
+        finally:
+            # A replica that is still working on an abandoned task stays out of the pool
+            if not abandoned:
+                self._release_replica(pool, replica)
+
+    def _release_replica(self, pool: ReplicaPool, replica: str):
+        pool.release(replica)
+        if not pool.busy:
+            self.agent_status[pool.name] = "idle"
+
+    def _abandon(self, thread: str, pool: ReplicaPool, replica: str) -> bool:
+        """
+        Stop waiting for a task. Its replica is kept out of the pool, as it is
+        still busy with the task, until the late reply comes in (and is
+        dropped) or, if it never does, for another subagent_response_timeout.
+
+        Returns:
+            False if the reply had already been collected and the replica is free
+        """
+        if self._awaiting.pop(thread, None) is None:
+            return False
+        cooldown = asyncio.get_running_loop().call_later(self.subagent_response_timeout, self._end_abandoned, thread)
+        self._abandoned[thread] = (pool, replica, cooldown)
+        return True
+
+    def _end_abandoned(self, thread: str) -> bool:
+        """Give an abandoned task's replica back to its pool. Returns False if the task was not abandoned."""
+        entry = self._abandoned.pop(thread, None)
+        if entry is None:
+            return False
+        pool, replica, cooldown = entry
+        cooldown.cancel()
+        self._release_replica(pool, replica)
+        return True
+
+    def dispatch(self, msg: Message):
+        # Late replies are dropped here, before LLMBehaviour sees them, also when no task is being delegated
+        if msg.thread and self._end_abandoned(msg.thread):
+            logger.info(f"Dropping late response from {msg.sender} to an abandoned task")
+            return []
+        return super().dispatch(msg)
+
+    def _collect(self, response_msg: Message):
+        sender = str(response_msg.sender)
+        thread = response_msg.thread
+        awaiting = self._awaiting.pop(thread, None) if thread else None
+        if awaiting is not None:
+            reply, session = awaiting
+            logger.info(f"Received response from {sender}: {(response_msg.body or '')[:100]}...")
+            # Add the message to context manually since we intercepted it
+            self.context.add_message(response_msg, session)
+            if not reply.done():
+                reply.set_result(response_msg.body)
+            return
+        if thread and self._end_abandoned(thread):
+            # Already in the mailbox when its task was abandoned
+            logger.info(f"Dropping late response from {sender} to an abandoned task")
+            return
+        logger.debug(f"Received message from {sender} while waiting for sub-agents, adding to context")
+        self.context.add_message(response_msg, thread or self.current_coordination_session)
+
+    async def release_run(self, run_id: str) -> int:
+        for replica in self._pool_of:
+            await self.llm_behaviour.send(release_message(replica, run_id))
+        return await super().release_run(run_id)
@@ -0,0 +1,387 @@
+"""
+Headless batch mode: runs many research queries unattended.
+
+Queries are read from a JSON-lines file, one per line, either as an object
+({"id": "rag-survey", "query": "..."}) or as a plain JSON string. Plans are
+validated by an approval policy instead of the user. Queries run in
+parallel slots, each with its own orchestrator and coordinator, while the
+planner, writer, critic and research sub-agents are shared.
+
+For every query the report is written to <output_dir>/<id>.md and its
+metadata (status, run id, timings, token usage, plan, sources) to <output_dir>/<id>.json.
+Queries whose metadata already records a completed run are skipped, so an
+interrupted batch resumes where it stopped.
+
+Usage:
+    python -m src.batch queries.jsonl --output-dir reports/batch --parallel 4
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import spade
+from slixmpp import JID
+from src.config.settings import settings
+from src.agents import (
+    ArXivAgent,
+    TavilyAgent,
+    WikipediaAgent,
+    PlannerAgent,
+    WriterAgent,
+    CriticAgent,
+    ResearchCoordinatorAgent,
+    create_replicas,
+)
+from src.agent import DeepResearchAgent
+from src.utils.paper_index import PaperIndex
+from src.utils.replicas import ReplicaPool
+from src.utils.approval import ApprovalPolicy, create_approval_policy
+from src.utils.startup import AgentLauncher, preload_ollama_model
+from src.utils.local_bus import create_message_bus
+from src.config.providers import create_provider, configured_models
+from src.utils.tracing import tracer
+from src.utils.logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Time given to a timed-out run to finish its current state and release its conversations
+KILL_GRACE_PERIOD = 120.0
+
+
+def _query_id(query: str) -> str:
+    return hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
+
+
+def load_queries(path: str) -> List[Dict[str, str]]:
+    """
+    Load the queries of a batch.
+
+    Args:
+        path: JSON-lines file with one query object or string per line
+
+    Returns:
+        Queries as {"id", "query"} dicts, in file order
+    """
+    queries = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"query": entry}
+            query = str(entry.get("query", "")).strip()
+            if not query:
+                raise ValueError(f"{path}:{line_number}: missing query")
+            # Ids name the output files; without one, the query hash keeps resumes stable
+            query_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(entry.get("id") or _query_id(query)))
+            if query_id in seen:
+                raise ValueError(f"{path}:{line_number}: duplicate query id {query_id}")
+            seen.add(query_id)
+            queries.append({"id": query_id, "query": query})
+    return queries
+
+
+def is_completed(output_dir: str, query_id: str) -> bool:
+    """Whether a previous batch already produced a report for this query."""
+    try:
+        with open(os.path.join(output_dir, f"{query_id}.json"), encoding="utf-8") as f:
+            return json.load(f).get("status") == "completed"
+    except (OSError, ValueError):
+        return False
+
+
+def _write_atomic(path: str, content: str):
+    # Write to a temporary file first so an interrupted batch never leaves half-written outputs
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_result(output_dir: str, item: Dict[str, str], orchestrator: DeepResearchAgent, status: str, started_at: float, duration: float):
+    """
+    Write a query's report and metadata. The metadata is written last: its
+    status is what a resumed batch checks.
+    """
+    report_file = None
+    if orchestrator.current_report:
+        report_file = f"{item['id']}.md"
+        _write_atomic(os.path.join(output_dir, report_file), orchestrator.current_report)
+
+    usage = orchestrator.run_usage
+    metadata: Dict[str, Any] = {
+        "id": item["id"],
+        "query": item["query"],
+        "status": status,
+        "run_id": orchestrator.run_id,
+        "started_at": datetime.fromtimestamp(started_at, timezone.utc).isoformat(timespec="seconds"),
+        "duration_s": round(duration, 3),
+        "report_file": report_file,
+        "plan_revisions": orchestrator.plan_revisions,
+        "plan": orchestrator.current_plan,
+        "sources": [
+            {"id": record.id, "source": record.source, "locator": record.locator, "title": record.title}
+            for record in (orchestrator.evidence.records if orchestrator.evidence else [])
+        ],
+        "iterations": [asdict(gain) for gain in orchestrator.research_gains],
+        "tokens": None,
+    }
+    if usage is not None:
+        metadata["tokens"] = {
+            "total": usage.total_tokens,
+            "calls": usage.calls,
+            "soft_exceeded": usage.soft_exceeded,
+            "hard_exceeded": usage.hard_exceeded,
+            "agents": {
+                name: {
+                    "calls": agent.calls,
+                    "prompt_tokens": agent.prompt_tokens,
+                    "completion_tokens": agent.completion_tokens,
+                }
+                for name, agent in sorted(usage.agents.items())
+            },
+        }
+    _write_atomic(os.path.join(output_dir, f"{item['id']}.json"), json.dumps(metadata, indent=2, ensure_ascii=False))
+
+
+async def run_query(orchestrator: DeepResearchAgent, item: Dict[str, str], output_dir: str, timeout: float) -> str:
+    """
+    Run one query on an idle orchestrator and write its outputs.
+
+    Returns:
+        The run's status: "completed", "no_report" or "timeout"
+    """
+    orchestrator.user_query = item["query"]
+    orchestrator.initial_query = item["query"]
+    started_at = time.time()
+    await orchestrator.start_research_workflow()
+
+    status = None
+    try:
+        await orchestrator.fsm.join(timeout=timeout)
+    except TimeoutError:
+        logger.error(f"[Batch] Query {item['id']} did not finish within {timeout}s")
+        status = "timeout"
+        orchestrator.fsm.kill()
+        try:
+            await orchestrator.fsm.join(timeout=KILL_GRACE_PERIOD)
+        except TimeoutError:
+            logger.error(f"[Batch] Run {orchestrator.run_id} did not stop after being killed")
+
+    if status is None:
+        status = "completed" if orchestrator.current_report else "no_report"
+    write_result(output_dir, item, orchestrator, status, started_at, time.time() - started_at)
+    return status
+
+
+async def run_batch(orchestrators: List[DeepResearchAgent], queries: List[Dict[str, str]], output_dir: str, timeout: float) -> Dict[str, int]:
+    """
+    Run queries over a pool of orchestrators, one query per orchestrator at a time.
+
+    Args:
+        orchestrators: Started, idle orchestrators (one per parallel slot)
+        queries: Queries to run
+        output_dir: Directory for reports and metadata
+        timeout: Seconds a single query may run
+
+    Returns:
+        Number of queries per status, including "skipped" for already completed ones
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    counts: Dict[str, int] = {"skipped": 0}
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in queries:
+        if is_completed(output_dir, item["id"]):
+            counts["skipped"] += 1
+        else:
+            pending.put_nowait(item)
+    total = pending.qsize()
+    logger.info(f"[Batch] {total} queries to run, {counts['skipped']} already completed")
+    print(f"Running {total} queries ({counts['skipped']} already completed) on {len(orchestrators)} slots")
+
+    async def slot(orchestrator: DeepResearchAgent):
+        while not pending.empty():
+            item = pending.get_nowait()
+            started = time.perf_counter()
+            try:
+                status = await run_query(orchestrator, item, output_dir, timeout)
+            except Exception as e:
+                logger.error(f"[Batch] Query {item['id']} failed: {e}", exc_info=True)
+                status = "error"
+            counts[status] = counts.get(status, 0) + 1
+            done = sum(count for name, count in counts.items() if name != "skipped")
+            tokens = orchestrator.run_usage.total_tokens if orchestrator.run_usage else 0
+            print(f"[{done}/{total}] {item['id']}: {status} in {time.perf_counter() - started:.1f}s ({tokens} tokens)")
+
+    await asyncio.gather(*(slot(orchestrator) for orchestrator in orchestrators))
+    return counts
+
+
+def log_output(*values, **kwargs):
+    """output_func for headless orchestrators: plans and reports go to the log, not the terminal."""
+    logger.debug(" ".join(str(value) for value in values))
+
+
+def create_orchestrators(
+    parallelism: int,
+    approval_policy: ApprovalPolicy,
+    provider_for,
+    planner_jid: str,
+    writer_jid: str,
+    critic_jid: str,
+    pools: List[ReplicaPool],
+    domain: str,
+    password: str,
+):
+    """
+    Create the per-slot agents. A coordinator serves one research run at a
+    time, so every slot gets its own coordinator next to its orchestrator.
+    The coordinators share the sub-agent replica pools, so tasks of all
+    slots queue for the same replicas.
+
+    Args:
+        provider_for: Function returning the provider for an agent name
+        pools: Replica pools of the research sub-agents
+
+    Returns:
+        (coordinators, orchestrators)
+    """
+    coordinators, orchestrators = [], []
+    for slot in range(1, parallelism + 1):
+        coordinator_jid = f"batch_coordinator{slot}@{domain}"
+        coordinators.append(ResearchCoordinatorAgent(
+            jid=coordinator_jid,
+            password=password,
+            subagent_ids=[pool.name for pool in pools],
+            pools=pools,
+            provider=provider_for(f"batch_coordinator{slot}"),
+        ))
+        orchestrators.append(DeepResearchAgent(
+            jid=f"batch_orchestrator{slot}@{domain}",
+            password=password,
+            user_query="",
+            planner_jid=planner_jid,
+            coordinator_jid=coordinator_jid,
+            writer_jid=writer_jid,
+            critic_jid=critic_jid,
+            approval_policy=approval_policy,
+            output_func=log_output,
+            listen_for_chat=False,
+            export_trace=False,
+        ))
+    return coordinators, orchestrators
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run research queries from a JSON-lines file without user interaction")
+    parser.add_argument("queries", help="JSON-lines file with one query per line")
+    parser.add_argument("--output-dir", default=settings.BATCH_OUTPUT_DIR, help="Directory for reports and metadata")
+    parser.add_argument("--parallel", type=int, default=settings.BATCH_PARALLELISM, help="Queries run at the same time")
+    parser.add_argument("--policy", choices=["auto", "rules"], default=settings.BATCH_APPROVAL_POLICY, help="Plan approval policy")
+    parser.add_argument("--timeout", type=float, default=settings.BATCH_QUERY_TIMEOUT, help="Timeout per query, in seconds")
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace):
+    queries = load_queries(args.queries)
+    logger.info(f"Loaded {len(queries)} queries from {args.queries}")
+
+    domain = settings.JID_DOMAIN
+    password = settings.PASSWORD
+
+    arxiv_jid = f"arxiv@{domain}"
+    tavily_jid = f"tavily@{domain}"
+    wikipedia_jid = f"wikipedia@{domain}"
+    planner_jid = f"planner@{domain}"
+    writer_jid = f"writer@{domain}"
+    critic_jid = f"critic@{domain}"
+
+    arxiv_agents, arxiv_pool = create_replicas(
+        ArXivAgent, arxiv_jid, settings.ARXIV_REPLICAS, password,
+        lambda name: create_provider("arxiv", name),
+        paper_index=PaperIndex(settings.ARXIV_STORAGE_PATH, settings.ARXIV_INDEX_PATH),
+    )
+    tavily_agents, tavily_pool = create_replicas(
+        TavilyAgent, tavily_jid, settings.TAVILY_REPLICAS, password,
+        lambda name: create_provider("tavily", name),
+        summary_provider=create_provider("summarizer"),
+    )
+    research_agents = [*arxiv_agents, *tavily_agents]
+    pools = [tavily_pool, arxiv_pool]
+    if settings.WIKIPEDIA_DUMP_PATH:
+        wikipedia_agents, wikipedia_pool = create_replicas(
+            WikipediaAgent, wikipedia_jid, settings.WIKIPEDIA_REPLICAS, password,
+            lambda name: create_provider("wikipedia", name),
+        )
+        research_agents += wikipedia_agents
+        pools.append(wikipedia_pool)
+    shared_agents = [
+        *research_agents,
+        PlannerAgent(planner_jid, password, create_provider("planner")),
+        WriterAgent(writer_jid, password, create_provider("writer")),
+        CriticAgent(critic_jid, password, create_provider("critic")),
+    ]
+    coordinators, orchestrators = create_orchestrators(
+        max(1, args.parallel),
+        # Plans may only use sources that have a sub-agent (pool names are "<source>@<domain>")
+        create_approval_policy(args.policy, allowed_sources=[JID(pool.name).local for pool in pools]),
+        lambda name: create_provider("coordinator", name),
+        planner_jid,
+        writer_jid,
+        critic_jid,
+        pools,
+        domain,
+        password,
+    )
+
+    launcher = AgentLauncher(
+        timeout=settings.AGENT_STARTUP_TIMEOUT,
+        bus=create_message_bus(settings.TRANSPORT),
+    )
+    await asyncio.gather(
+        launcher.start(*shared_agents, *coordinators),
+        *(preload_ollama_model(base_url, model, settings.OLLAMA_KEEP_ALIVE) for base_url, model in configured_models()),
+    )
+    await launcher.start(*orchestrators)
+
+    started = time.perf_counter()
+    try:
+        counts = await run_batch(orchestrators, queries, args.output_dir, args.timeout)
+    finally:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        trace_prefix = tracer.export(os.path.join(settings.TRACE_DIR, f"batch_{timestamp}"))
+        if trace_prefix:
+            logger.info(f"Trace written to {trace_prefix}.jsonl and {trace_prefix}.trace.json")
+        await launcher.stop()
+
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+    print(f"Batch finished in {time.perf_counter() - started:.1f}s: {summary}")
+    print(f"Outputs in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    os.makedirs("logs/deep_research", exist_ok=True)
+    log_filename = f"logs/deep_research/batch_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.jsonl"
+    setup_logging(
+        log_filename,
+        level=settings.LOG_LEVEL,
+        logger_levels={"spade_llm.providers": settings.LOG_PROVIDER_LEVEL},
+        max_chars=settings.LOG_MAX_MESSAGE_CHARS,
+        debug_sample_rate=settings.LOG_DEBUG_SAMPLE_RATE,
+    )
+    print(f"Logging to: {log_filename}")
+    try:
+        spade.run(main(arguments))
+    except KeyboardInterrupt:
+        logger.warning("Interrupted by user. Completed queries are kept; rerun to resume.")
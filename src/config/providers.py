@@ -0,0 +1,57 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Set, Tuple
+from spade_llm.providers import LLMProvider
+from spade_llm.providers.base_provider import BaseLLMProvider
+from src.config.settings import settings
+from src.utils.tracing import TracedProvider
+from src.utils.budget import MeteredProvider
+from src.utils.escalation import EscalatingProvider, has_text, is_research_plan, is_critic_review
+
+# How each role's final answers are checked before escalating to FALLBACK_MODEL
+VALIDATORS = {
+    "planner": is_research_plan,
+    "critic": is_critic_review,
+}
+
+
+@lru_cache(maxsize=None)
+def _ollama_provider(base_url: str, model: str) -> LLMProvider:
+    # Roles on the same model and endpoint share one provider
+    return LLMProvider.create_ollama(base_url=base_url, model=model)
+
+
+def _instrumented(provider: BaseLLMProvider, agent_name: str) -> MeteredProvider:
+    return MeteredProvider(TracedProvider(provider, agent_name), agent_name)
+
+
+def create_provider(role: str, agent_name: Optional[str] = None) -> BaseLLMProvider:
+    """
+    Create the traced, metered provider for an agent role.
+
+    The model and endpoint come from the role's settings (see Settings.ROLE_MODELS).
+    For roles in FALLBACK_ROLES, answers that fail the role's validator are
+    retried on FALLBACK_MODEL.
+
+    Args:
+        role: One of Settings.MODEL_ROLES
+        agent_name: Name for traces and token accounting. Defaults to the role.
+
+    Returns:
+        The provider
+    """
+    if role not in settings.MODEL_ROLES:
+        raise ValueError(f"Unknown model role: {role}")
+    agent_name = agent_name or role
+    model = settings.model_for(role)
+    provider = _instrumented(_ollama_provider(settings.base_url_for(role), model), agent_name)
+
+    if settings.FALLBACK_MODEL and settings.FALLBACK_MODEL != model and role in settings.FALLBACK_ROLES:
+        fallback_url = settings.FALLBACK_BASE_URL or settings.OLLAMA_BASE_URL
+        fallback = _instrumented(_ollama_provider(fallback_url, settings.FALLBACK_MODEL), agent_name)
+        provider = EscalatingProvider(provider, fallback, VALIDATORS.get(role, has_text), agent_name)
+    return provider
+
+
+def configured_models(roles: Iterable[str] = settings.MODEL_ROLES) -> Set[Tuple[str, str]]:
+    """(base_url, model) pairs used by the given roles, for preloading."""
+    return {(settings.base_url_for(role), settings.model_for(role)) for role in roles}
@@ -0,0 +1,25 @@
+from typing import List, Literal
+from pydantic import BaseModel, Field
+
+
+class ResearchTopic(BaseModel):
+    topic_id: str
+    query: str
+    source: Literal["arxiv", "tavily", "wikipedia"]
+    description: str
+
+
+class ResearchPlan(BaseModel):
+    """Output schema of the planner (see PLANNER_SYSTEM_PROMPT)."""
+
+    original_query: str
+    research_goal: str
+    topics: List[ResearchTopic]
+
+
+class CriticReview(BaseModel):
+    """Output schema of the critic (see CRITIC_SYSTEM_PROMPT)."""
+
+    status: Literal["SUFFICIENT", "INSUFFICIENT"]
+    feedback: str
+    missing_information: List[str] = Field(default_factory=list)
@@ -15,11 +15,115 @@ class Settings:
     OPENAI_API_KEY = get_env_var("OPENAI_API_KEY", "")
     TAVILY_API_KEY = get_env_var("TAVILY_API_KEY", "")
     OLLAMA_BASE_URL = get_env_var("OLLAMA_BASE_URL", "")
+    OLLAMA_MODEL = get_env_var("OLLAMA_MODEL", "gpt-oss:20b")
+    OLLAMA_KEEP_ALIVE = get_env_var("OLLAMA_KEEP_ALIVE", "30m")
+    
+    # Model and endpoint per role, from <ROLE>_MODEL and <ROLE>_BASE_URL (e.g. CRITIC_MODEL=qwen3:4b).
+    # Roles left unset use OLLAMA_MODEL and OLLAMA_BASE_URL.
+    MODEL_ROLES = ("planner", "coordinator", "arxiv", "tavily", "wikipedia", "summarizer", "writer", "critic")
+    ROLE_MODELS = {role: get_env_var(f"{role.upper()}_MODEL", "") for role in MODEL_ROLES}
+    ROLE_BASE_URLS = {role: get_env_var(f"{role.upper()}_BASE_URL", "") for role in MODEL_ROLES}
+    # Larger model that takes over when a role's output fails validation; empty disables escalation
+    FALLBACK_MODEL = get_env_var("FALLBACK_MODEL", "")
+    FALLBACK_BASE_URL = get_env_var("FALLBACK_BASE_URL", "")
+    FALLBACK_ROLES = [role.strip() for role in get_env_var("FALLBACK_ROLES", "planner,critic").split(",") if role.strip()]
     
     JID_DOMAIN = get_env_var("JID_DOMAIN", "localhost")
     PASSWORD = get_env_var("PASSWORD", "password")
+    AGENT_STARTUP_TIMEOUT = float(get_env_var("AGENT_STARTUP_TIMEOUT", "30"))
+    # "xmpp": agents connect to the XMPP server; messages between agents of this process
+    #         already skip it (SPADE's container delivers them in memory)
+    # "local": no XMPP server at all, only agents of this process can talk
+    TRANSPORT = get_env_var("TRANSPORT", "xmpp")
+    # Instances of each research sub-agent (e.g. tavily1@..., tavily2@...); the coordinator spreads tasks over idle ones
+    TAVILY_REPLICAS = int(get_env_var("TAVILY_REPLICAS", "1"))
+    ARXIV_REPLICAS = int(get_env_var("ARXIV_REPLICAS", "1"))
+    WIKIPEDIA_REPLICAS = int(get_env_var("WIKIPEDIA_REPLICAS", "1"))
+    
+    # Constrain planner and critic output to their JSON schemas (needs provider support for response_format)
+    STRUCTURED_OUTPUT = get_env_var("STRUCTURED_OUTPUT", "true").lower() == "true"
+    
+    # Prompt size (estimated tokens) above which coordinator and sub-agent histories are compacted; 0 disables
+    CONTEXT_MAX_TOKENS = int(get_env_var("CONTEXT_MAX_TOKENS", "24000"))
+    # Single messages (e.g. tool results) above this size are clipped in the prompt; 0 disables
+    CONTEXT_MAX_MESSAGE_TOKENS = int(get_env_var("CONTEXT_MAX_MESSAGE_TOKENS", "4000"))
+    
+    # Tokens per research run (estimated, all agents); 0 disables the limit.
+    # Soft: the run skips further research loops and outputs its best report.
+    # Hard: further LLM calls of the run are refused.
+    TOKEN_BUDGET_SOFT = int(get_env_var("TOKEN_BUDGET_SOFT", "0"))
+    TOKEN_BUDGET_HARD = int(get_env_var("TOKEN_BUDGET_HARD", "0"))
+    
+    # Headless batch mode (python -m src.batch)
+    BATCH_PARALLELISM = int(get_env_var("BATCH_PARALLELISM", "2"))
+    BATCH_OUTPUT_DIR = get_env_var("BATCH_OUTPUT_DIR", "./reports/batch")
+    # Seconds a single query may run before it is abandoned
+    BATCH_QUERY_TIMEOUT = float(get_env_var("BATCH_QUERY_TIMEOUT", "1800"))
+    # "auto": approve every plan; "rules": check topic count and sources first
+    BATCH_APPROVAL_POLICY = get_env_var("BATCH_APPROVAL_POLICY", "rules")
+    
+    LOG_LEVEL = get_env_var("LOG_LEVEL", "WARNING")
+    LOG_PROVIDER_LEVEL = get_env_var("LOG_PROVIDER_LEVEL", "DEBUG")
+    LOG_MAX_MESSAGE_CHARS = int(get_env_var("LOG_MAX_MESSAGE_CHARS", "2000"))
+    LOG_DEBUG_SAMPLE_RATE = float(get_env_var("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    
+    TRACE_ENABLED = get_env_var("TRACE_ENABLED", "true").lower() == "true"
+    TRACE_DIR = get_env_var("TRACE_DIR", "./logs/traces")
+    
+    # Local BM25 reranking of web search results before they are summarized
+    RERANK_ENABLED = get_env_var("RERANK_ENABLED", "true").lower() == "true"
+    # Results kept per search, never more than the search's max_results; 0 keeps all that pass the cutoff
+    RERANK_TOP_K = int(get_env_var("RERANK_TOP_K", "3"))
+    # Results scoring below this fraction of the best result are dropped
+    RERANK_MIN_SCORE = float(get_env_var("RERANK_MIN_SCORE", "0.3"))
+    
+    # Length of each source summary kept in a run's evidence store (and shown to the writer)
+    EVIDENCE_SUMMARY_MAX_CHARS = int(get_env_var("EVIDENCE_SUMMARY_MAX_CHARS", "1200"))
+    
+    # Rule-based review of each draft before the critic: clear passes and clear gaps skip the critic LLM
+    REPORT_PRECHECK_ENABLED = get_env_var("REPORT_PRECHECK_ENABLED", "true").lower() == "true"
+    REPORT_MIN_WORDS = int(get_env_var("REPORT_MIN_WORDS", "300"))
+    # Words that must appear in a section heading ("references" only when sources were gathered)
+    REPORT_REQUIRED_SECTIONS = [s.strip() for s in get_env_var("REPORT_REQUIRED_SECTIONS", "summary,references").split(",") if s.strip()]
+    # Share of plan topics the report must cover to pass, and below which it fails
+    REPORT_PASS_COVERAGE = float(get_env_var("REPORT_PASS_COVERAGE", "1.0"))
+    REPORT_FAIL_COVERAGE = float(get_env_var("REPORT_FAIL_COVERAGE", "0.5"))
+    # Share of gathered sources the report must cite to pass
+    REPORT_PASS_CITATION_RATIO = float(get_env_var("REPORT_PASS_CITATION_RATIO", "0.5"))
+    # Rewrites asked for by the pre-check per run; after that, failing drafts go to the critic
+    REPORT_MAX_REWRITES = int(get_env_var("REPORT_MAX_REWRITES", "1"))
+    
+    # The critic -> research loop stops once an iteration brings less new evidence (share of novel
+    # content among returned sources) or changes the report less (difflib) than these; 0 disables
+    CONVERGENCE_MIN_NOVELTY = float(get_env_var("CONVERGENCE_MIN_NOVELTY", "0.2"))
+    CONVERGENCE_MIN_REPORT_CHANGE = float(get_env_var("CONVERGENCE_MIN_REPORT_CHANGE", "0.05"))
+    
+    # Claim checks: message payloads above this size are stored once in a local blob store and sent
+    # as references (agents must share the host); 0 disables
+    BLOB_STORE_DIR = get_env_var("BLOB_STORE_DIR", "./data/blobs")
+    BLOB_THRESHOLD_BYTES = int(get_env_var("BLOB_THRESHOLD_BYTES", "4096"))
+    # Blobs are deleted at the end of a run once unused for this long, then oldest first above the size cap (0 = off)
+    BLOB_MAX_AGE_SECONDS = float(get_env_var("BLOB_MAX_AGE_SECONDS", "86400"))
+    BLOB_MAX_BYTES = int(get_env_var("BLOB_MAX_BYTES", "0"))
     
     ARXIV_STORAGE_PATH = get_env_var("ARXIV_STORAGE_PATH", "./data/arxiv_papers")
+    ARXIV_INDEX_PATH = get_env_var("ARXIV_INDEX_PATH", "./data/arxiv_index.sqlite3")
+    PAPER_READ_MAX_BYTES = int(get_env_var("PAPER_READ_MAX_BYTES", "20000"))
+    
+    # Uncompressed Wikipedia pages-articles XML dump for the offline Wikipedia agent; empty disables the agent.
+    # Build or extend its index with: python -m src.utils.wiki_index
+    WIKIPEDIA_DUMP_PATH = get_env_var("WIKIPEDIA_DUMP_PATH", "")
+    WIKIPEDIA_INDEX_PATH = get_env_var("WIKIPEDIA_INDEX_PATH", "./data/wikipedia_index")
+    WIKIPEDIA_SEGMENT_ARTICLES = int(get_env_var("WIKIPEDIA_SEGMENT_ARTICLES", "20000"))
+    # Prefix of the article URLs used as citation locators
+    WIKIPEDIA_URL = get_env_var("WIKIPEDIA_URL", "https://en.wikipedia.org/wiki/")
+    WIKIPEDIA_READ_MAX_CHARS = int(get_env_var("WIKIPEDIA_READ_MAX_CHARS", "12000"))
+
+    def model_for(self, role: str) -> str:
+        return self.ROLE_MODELS.get(role) or self.OLLAMA_MODEL
+
+    def base_url_for(self, role: str) -> str:
+        return self.ROLE_BASE_URLS.get(role) or self.OLLAMA_BASE_URL
 
 settings = Settings()
 
@@ -1,23 +1,40 @@
 import logging
 import asyncio
 from tavily import TavilyClient
-from typing import List, Dict, Any, Literal
+from typing import List, Dict, Any, Literal, Optional
+from src.config.settings import settings
 from src.utils.summarizer import summarize_content as summarize_with_llm
+from src.utils.paper_index import PaperIndex
+from src.utils.paper_reader import PaperReader
+from src.utils.wiki_index import WikiIndex
+from src.utils.tracing import tracer
+from src.utils.rerank import rerank_results
+from src.utils.evidence import EvidenceRecorder, cite
 
-tavily_client = TavilyClient()
+_tavily_client = None
 
-def create_tavily_search_tool(summary_provider = None):
+def get_tavily_client() -> TavilyClient:
+    """Create the shared Tavily client on first use, so importing this module needs no API key."""
+    global _tavily_client
+    if _tavily_client is None:
+        _tavily_client = TavilyClient()
+    return _tavily_client
+
+def create_tavily_search_tool(summary_provider = None, client = None):
     """
     Create a Tavily search tool for the given summary_provider.
     
     Args:
         summary_provider: Optional LLM provider for content summarization
+        client: Optional Tavily-compatible client. Defaults to the shared TavilyClient.
     
     Returns:
         LLMTool configured for Tavily search
     """
     from spade_llm.tools import LLMTool
     
+    evidence = EvidenceRecorder("tavily")
+    
     async def tavily_search_impl(
         query: str,
         max_results: int = 3,
@@ -31,6 +48,7 @@ def create_tavily_search_tool(summary_provider = None):
                 max_results=max_results,
                 topic=topic,
                 summary_provider=summary_provider,
+                client=client,
             )
             
             if not results:
@@ -39,8 +57,9 @@ def create_tavily_search_tool(summary_provider = None):
             
             formatted_results = []
             for i, result in enumerate(results, 1):
+                record = evidence.record(result.get("url", ""), query, result.get("summary", ""), result.get("title", ""))
                 formatted_results.append(
-                    f"Document {i}. **{result.get('title', 'N/A')}**\n"
+                    f"Document {i}{cite(record)}. **{result.get('title', 'N/A')}**\n"
                     f"   URL: {result.get('url', 'N/A')}\n"
                     f"   Summary: {result.get('summary', 'N/A')}"
                 )
@@ -52,7 +71,7 @@ def create_tavily_search_tool(summary_provider = None):
             logging.error(f"Error in tavily_search_impl: {e}", exc_info=True)
             return f"Error performing search: {str(e)}"
     
-    return LLMTool(
+    tool = LLMTool(
         name="tavily_search",
         description="Search the web for current information using Tavily. Returns formatted results with titles, URLs, and summaries.",
         parameters={
@@ -78,6 +97,283 @@ def create_tavily_search_tool(summary_provider = None):
         },
         func=tavily_search_impl
     )
+    return evidence.attach(tool)
+
+def create_local_paper_search_tool(index: Optional[PaperIndex] = None):
+    """
+    Create a full-text search tool over the papers already downloaded to ARXIV_STORAGE_PATH.
+
+    The tool only searches the index; ArXivAgent keeps it up to date (a
+    full refresh at startup, then one paper per download).
+    
+    Args:
+        index: Optional PaperIndex to search. Defaults to one built from settings.
+    
+    Returns:
+        LLMTool configured for local paper search
+    """
+    from spade_llm.tools import LLMTool
+    
+    if index is None:
+        index = PaperIndex(settings.ARXIV_STORAGE_PATH, settings.ARXIV_INDEX_PATH)
+    evidence = EvidenceRecorder("arxiv")
+    
+    def search_local_papers_impl(query: str, max_results: int = 5) -> str:
+        logging.info(f"Local paper search called with query: {query}, max_results: {max_results}")
+        
+        try:
+            results = index.search(query, limit=max_results)
+            
+            if not results:
+                return "No matching sections in locally stored papers."
+            
+            formatted_results = []
+            for i, result in enumerate(results, 1):
+                record = evidence.record(f"arXiv:{result['paper_id']}", query, result["snippet"])
+                formatted_results.append(
+                    f"Result {i}{cite(record)}. **{result['paper_id']}** - {result['section']} (section {result['ordinal']})\n"
+                    f"   Snippet: {result['snippet']}"
+                )
+            
+            logging.info(f"Returning {len(results)} local paper sections")
+            return "\n\n".join(formatted_results)
+        except Exception as e:
+            logging.error(f"Error in search_local_papers_impl: {e}", exc_info=True)
+            return f"Error searching local papers: {str(e)}"
+    
+    tool = LLMTool(
+        name="search_local_papers",
+        description="Search the full text of ArXiv papers that were already downloaded. Fast and offline; use it before any remote search. Returns matching paper ids, sections and snippets.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of sections to return (default: 5)",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        },
+        func=search_local_papers_impl
+    )
+    return evidence.attach(tool)
+
+def create_paper_section_reader_tool(index: Optional[PaperIndex] = None):
+    """
+    Create a tool that reads a single section or byte range of a stored paper.
+    
+    Args:
+        index: Optional PaperIndex holding the section offset tables. Defaults to one built from settings.
+    
+    Returns:
+        LLMTool configured for memory-mapped paper reads
+    """
+    from spade_llm.tools import LLMTool
+    
+    if index is None:
+        index = PaperIndex(settings.ARXIV_STORAGE_PATH, settings.ARXIV_INDEX_PATH)
+    reader = PaperReader(index, max_bytes=settings.PAPER_READ_MAX_BYTES)
+    evidence = EvidenceRecorder("arxiv")
+    
+    def read_paper_range_impl(
+        paper_id: str,
+        section: Optional[str] = None,
+        start: Optional[int] = None,
+        length: Optional[int] = None
+    ) -> str:
+        logging.info(f"Paper range read called for {paper_id}: section={section}, start={start}, length={length}")
+        
+        try:
+            if section is not None:
+                result = reader.read_section(paper_id, section)
+                if result is None:
+                    return f"Section '{section}' not found in paper {paper_id}. Call without arguments to list sections."
+                header = f"**{paper_id}** - {result['title']}"
+            elif start is not None:
+                result = reader.read_range(paper_id, start, length or settings.PAPER_READ_MAX_BYTES)
+                if result is None:
+                    return f"Paper {paper_id} is not stored locally."
+                header = f"**{paper_id}** - bytes {start}+"
+            else:
+                toc = reader.table_of_contents(paper_id)
+                if toc is None:
+                    return f"Paper {paper_id} is not stored locally."
+                return f"Sections of **{paper_id}**:\n{toc}"
+            
+            if result["truncated"]:
+                header += f" (truncated to {settings.PAPER_READ_MAX_BYTES} bytes)"
+            record = evidence.record(f"arXiv:{paper_id}", section or f"bytes {start}+", result["text"], result.get("title", ""))
+            header += cite(record)
+            return f"{header}\n\n{result['text']}"
+        except Exception as e:
+            logging.error(f"Error in read_paper_range_impl: {e}", exc_info=True)
+            return f"Error reading paper: {str(e)}"
+    
+    tool = LLMTool(
+        name="read_paper_range",
+        description="Read only one section (by number or title) or a byte range of a locally stored paper instead of the whole document. Call with just paper_id to list its sections.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "paper_id": {
+                    "type": "string",
+                    "description": "The paper id, e.g. 1706.03762"
+                },
+                "section": {
+                    "type": "string",
+                    "description": "Section number or part of the section title"
+                },
+                "start": {
+                    "type": "integer",
+                    "description": "Byte offset to start reading from (ignored if section is given)"
+                },
+                "length": {
+                    "type": "integer",
+                    "description": "Number of bytes to read from start"
+                }
+            },
+            "required": ["paper_id"]
+        },
+        func=read_paper_range_impl
+    )
+    return evidence.attach(tool)
+
+def get_wiki_index() -> WikiIndex:
+    return WikiIndex(settings.WIKIPEDIA_DUMP_PATH, settings.WIKIPEDIA_INDEX_PATH, settings.WIKIPEDIA_SEGMENT_ARTICLES)
+
+def wikipedia_url(title: str) -> str:
+    return settings.WIKIPEDIA_URL + title.replace(" ", "_")
+
+def create_wikipedia_search_tool(index: Optional[WikiIndex] = None):
+    """
+    Create a search tool over the local Wikipedia dump index.
+    
+    Args:
+        index: Optional WikiIndex to search. Defaults to one built from settings.
+    
+    Returns:
+        LLMTool configured for offline Wikipedia search
+    """
+    from spade_llm.tools import LLMTool
+    
+    if index is None:
+        index = get_wiki_index()
+    evidence = EvidenceRecorder("wikipedia")
+    
+    def search_wikipedia_impl(query: str, max_results: int = 5) -> str:
+        logging.info(f"Wikipedia search called with query: {query}, max_results: {max_results}")
+        
+        try:
+            with tracer.span("wikipedia_search", category="tool", query=query) as span:
+                results = index.search(query, limit=max_results)
+                if span is not None:
+                    span.set(results=len(results))
+            
+            if not results:
+                if not index.articles:
+                    return "The Wikipedia index is empty. It is built with: python -m src.utils.wiki_index"
+                return "No matching Wikipedia articles."
+            
+            formatted_results = []
+            for i, result in enumerate(results, 1):
+                record = evidence.record(wikipedia_url(result["title"]), query, result["snippet"], result["title"])
+                formatted_results.append(
+                    f"Result {i}{cite(record)}. **{result['title']}**\n"
+                    f"   Lead: {result['snippet']}"
+                )
+            
+            logging.info(f"Returning {len(results)} Wikipedia articles")
+            return "\n\n".join(formatted_results)
+        except Exception as e:
+            logging.error(f"Error in search_wikipedia_impl: {e}", exc_info=True)
+            return f"Error searching Wikipedia: {str(e)}"
+    
+    tool = LLMTool(
+        name="search_wikipedia",
+        description="Search a local, offline copy of Wikipedia. Returns matching article titles with the start of their lead section.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of articles to return (default: 5)",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        },
+        func=search_wikipedia_impl
+    )
+    return evidence.attach(tool)
+
+def create_wikipedia_section_reader_tool(index: Optional[WikiIndex] = None):
+    """
+    Create a tool that reads a single section of a Wikipedia article from the local dump.
+    
+    Args:
+        index: Optional WikiIndex locating the articles. Defaults to one built from settings.
+    
+    Returns:
+        LLMTool configured for lazy Wikipedia section reads
+    """
+    from spade_llm.tools import LLMTool
+    
+    if index is None:
+        index = get_wiki_index()
+    evidence = EvidenceRecorder("wikipedia")
+    
+    def read_wikipedia_section_impl(title: str, section: Optional[str] = None) -> str:
+        logging.info(f"Wikipedia section read called for {title}: section={section}")
+        
+        try:
+            article = index.article(title)
+            if article is None:
+                return f"No Wikipedia article titled '{title}' in the local index. Use search_wikipedia to find titles."
+            if section is None:
+                return f"Sections of **{article.title}**:\n{article.table_of_contents()}"
+            
+            result = article.read_section(section, max_chars=settings.WIKIPEDIA_READ_MAX_CHARS)
+            if result is None:
+                return f"Section '{section}' not found in {article.title}. Call without section to list sections."
+            header = f"**{article.title}** - {result['title']}"
+            if result["truncated"]:
+                header += f" (truncated to {settings.WIKIPEDIA_READ_MAX_CHARS} characters)"
+            record = evidence.record(wikipedia_url(article.title), result["title"], result["text"], article.title)
+            header += cite(record)
+            return f"{header}\n\n{result['text']}"
+        except Exception as e:
+            logging.error(f"Error in read_wikipedia_section_impl: {e}", exc_info=True)
+            return f"Error reading Wikipedia article: {str(e)}"
+    
+    tool = LLMTool(
+        name="read_wikipedia_section",
+        description="Read one section (by number or title) of a Wikipedia article from the local copy. Call with just the title to list its sections.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "The article title, as returned by search_wikipedia"
+                },
+                "section": {
+                    "type": "string",
+                    "description": "Section number or part of the section title (0 is the introduction)"
+                }
+            },
+            "required": ["title"]
+        },
+        func=read_wikipedia_section_impl
+    )
+    return evidence.attach(tool)
 
 async def summarize_content(
     results: Dict[str, Any],
@@ -101,11 +397,12 @@ async def summarize_content(
         if raw_content and summary_provider:
             if len(raw_content) > 500:  # Summarize if content is long
                 try:
-                    summary = await summarize_with_llm(
-                        summary_provider=summary_provider,
-                        content=raw_content,
-                        context="Extract key findings and main points from this web content"
-                    )
+                    with tracer.span("summarize", category="tool", url=url, content_bytes=len(raw_content)):
+                        summary = await summarize_with_llm(
+                            summary_provider=summary_provider,
+                            content=raw_content,
+                            context="Extract key findings and main points from this web content"
+                        )
                 except Exception as e:
                     logging.error(f"Error summarizing content from {url}: {e}")
             else:
@@ -124,33 +421,40 @@ async def tavily_search(
     query: str,
     max_results: int = 3,
     topic: Literal["general", "news", "finance"] = "general",
-    summary_provider = None
+    summary_provider = None,
+    client = None
 ) -> List[Dict[str, Any]]:
     """
     Perform a search using the Tavily API.
     
     Args:
         query: Search query
-        max_results: Maximum number of results
+        max_results: Maximum number of results, also after reranking
         topic: Search topic category
         summary_provider: Optional LLM provider for content summarization
+        client: Optional Tavily-compatible client. Defaults to the shared TavilyClient.
     
     Returns:
-        List of search results. If summary_provider is provided,
-        results will have 'summary' field. Otherwise, 'content' field is used.
+        List of search results, reranked by relevance to the query when
+        RERANK_ENABLED; reranking keeps at most min(RERANK_TOP_K, max_results)
+        of them (max_results alone when RERANK_TOP_K is 0). If summary_provider is provided, results will have
+        'summary' field. Otherwise, 'content' field is used.
     """
     try:
         logging.info(f"Starting Tavily search for: {query}")
         
         # Run the synchronous tavily_client.search() in a thread pool
-        results = await asyncio.to_thread(
-            tavily_client.search,
-            query=query,
-            max_results=max_results,
-            topic=topic,
-            include_raw_content=True,
-            include_images=False
-        )
+        with tracer.span("tavily_api", category="tool", query=query, max_results=max_results) as span:
+            results = await asyncio.to_thread(
+                (client or get_tavily_client()).search,
+                query=query,
+                max_results=max_results,
+                topic=topic,
+                include_raw_content=True,
+                include_images=False
+            )
+            if span is not None:
+                span.set(results=len(results.get("results", [])))
         
         logging.info(f"Tavily returned {len(results.get('results', []))} results")
 
@@ -162,6 +466,15 @@ async def tavily_search(
         
         logging.info(f"Processing {len(unique_results)} unique results")
         
+        # Drop results that are not relevant to the query before paying for their summaries
+        if settings.RERANK_ENABLED:
+            top_k = min(settings.RERANK_TOP_K, max_results) if settings.RERANK_TOP_K > 0 else max_results
+            with tracer.span("rerank", category="tool", query=query, candidates=len(unique_results)) as span:
+                kept = rerank_results(query, list(unique_results.values()), top_k, settings.RERANK_MIN_SCORE)
+                if span is not None:
+                    span.set(kept=len(kept))
+            unique_results = {result.get("url"): result for result in kept}
+        
         # Summarize content if summary_provider available
         await summarize_content(unique_results, summary_provider)
         
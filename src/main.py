@@ -4,31 +4,36 @@ import asyncio
 import logging
 import sys
 import spade
-from spade_llm.providers import LLMProvider
-from spade_llm.agent.coordinator_agent import CoordinatorAgent
 from src.config.settings import settings
 from src.agents import (
     ArXivAgent, 
     TavilyAgent, 
+    WikipediaAgent,
     PlannerAgent, 
     WriterAgent, 
     CriticAgent,
+    ResearchCoordinatorAgent,
+    create_replicas,
 )
 from src.agent import DeepResearchAgent
+from src.utils.paper_index import PaperIndex
+from src.utils.startup import AgentLauncher, preload_ollama_model
+from src.utils.local_bus import create_message_bus
+from src.config.providers import create_provider, configured_models
+from src.utils.logging_setup import setup_logging
 
 # Configure logging
 os.makedirs("logs/deep_research", exist_ok=True)
 timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-log_filename = f"logs/deep_research/run_{timestamp}.log"
+log_filename = f"logs/deep_research/run_{timestamp}.jsonl"
 
-logging.basicConfig(
-    filename=log_filename,
-    filemode='w',
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.WARNING,
-    force=True 
+setup_logging(
+    log_filename,
+    level=settings.LOG_LEVEL,
+    logger_levels={"spade_llm.providers": settings.LOG_PROVIDER_LEVEL},
+    max_chars=settings.LOG_MAX_MESSAGE_CHARS,
+    debug_sample_rate=settings.LOG_DEBUG_SAMPLE_RATE,
 )
-logging.getLogger("spade_llm.providers").setLevel(logging.DEBUG)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 print(f"Logging to: {log_filename}")
@@ -40,16 +45,12 @@ async def async_input(prompt: str) -> str:
 async def main():
     logger.info("Initializing Deep Research System...")
     
-    provider = LLMProvider.create_ollama(
-        base_url=settings.OLLAMA_BASE_URL,
-        model="gpt-oss:20b"
-    )
-    
     domain = settings.JID_DOMAIN
     password = settings.PASSWORD
     
     arxiv_jid = f"arxiv@{domain}"
     tavily_jid = f"tavily@{domain}"
+    wikipedia_jid = f"wikipedia@{domain}"
     planner_jid = f"planner@{domain}"
     writer_jid = f"writer@{domain}"
     critic_jid = f"critic@{domain}"
@@ -57,32 +58,49 @@ async def main():
     orchestrator_jid = f"orchestrator@{domain}"
     
     logger.info("Creating Research Sub-Agents...")
-    arxiv_agent = ArXivAgent(arxiv_jid, password, provider)
-    tavily_agent = TavilyAgent(tavily_jid, password, provider)
+    arxiv_agents, arxiv_pool = create_replicas(
+        ArXivAgent, arxiv_jid, settings.ARXIV_REPLICAS, password,
+        lambda name: create_provider("arxiv", name),
+        paper_index=PaperIndex(settings.ARXIV_STORAGE_PATH, settings.ARXIV_INDEX_PATH),
+    )
+    tavily_agents, tavily_pool = create_replicas(
+        TavilyAgent, tavily_jid, settings.TAVILY_REPLICAS, password,
+        lambda name: create_provider("tavily", name),
+        summary_provider=create_provider("summarizer"),
+    )
+    research_agents = [*arxiv_agents, *tavily_agents]
+    pools = [tavily_pool, arxiv_pool]
+    if settings.WIKIPEDIA_DUMP_PATH:
+        wikipedia_agents, wikipedia_pool = create_replicas(
+            WikipediaAgent, wikipedia_jid, settings.WIKIPEDIA_REPLICAS, password,
+            lambda name: create_provider("wikipedia", name),
+        )
+        research_agents += wikipedia_agents
+        pools.append(wikipedia_pool)
     
     logger.info("Creating Coordinator Agent...")
-    coordinator = CoordinatorAgent(
+    coordinator = ResearchCoordinatorAgent(
         jid=coordinator_jid,
         password=password,
-        subagent_ids=[tavily_jid, arxiv_jid],
-        provider=provider,
-        coordination_session="deep_research_session"
+        subagent_ids=[pool.name for pool in pools],
+        pools=pools,
+        provider=create_provider("coordinator"),
     )
     
     logger.info("Creating Specialized Agents...")
-    planner = PlannerAgent(planner_jid, password, provider)
-    writer = WriterAgent(writer_jid, password, provider)
-    critic = CriticAgent(critic_jid, password, provider)
+    planner = PlannerAgent(planner_jid, password, create_provider("planner"))
+    writer = WriterAgent(writer_jid, password, create_provider("writer"))
+    critic = CriticAgent(critic_jid, password, create_provider("critic"))
     
-    await arxiv_agent.start()
-    await tavily_agent.start()
-    await coordinator.start()
-    await planner.start()
-    await writer.start()
-    await critic.start()
-    
-    logger.info("Waiting for agents to come online...")
-    await asyncio.sleep(2)
+    logger.info("Starting agents and preloading models...")
+    launcher = AgentLauncher(
+        timeout=settings.AGENT_STARTUP_TIMEOUT,
+        bus=create_message_bus(settings.TRANSPORT),
+    )
+    await asyncio.gather(
+        launcher.start(*research_agents, coordinator, planner, writer, critic),
+        *(preload_ollama_model(base_url, model, settings.OLLAMA_KEEP_ALIVE) for base_url, model in configured_models()),
+    )
     
     # Orchestrator (User Interaction)
     query = await async_input("\nEnter your research query: ")
@@ -101,19 +119,13 @@ async def main():
         input_func=async_input
     )
     
-    await orchestrator.start()
+    await launcher.start(orchestrator)
     
     while orchestrator.is_alive():
         await asyncio.sleep(1)
         
     logger.info("Stopping all agents...")
-    
-    await arxiv_agent.stop()
-    await tavily_agent.stop()
-    await coordinator.stop()
-    await planner.stop()
-    await writer.stop()
-    await critic.stop()
+    await launcher.stop()
     
     logger.info("All agents stopped.")
 
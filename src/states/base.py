@@ -0,0 +1,85 @@
+import uuid
+import logging
+from typing import Callable, Optional
+from spade.behaviour import State
+from spade.message import Message
+from src.utils.tracing import tracer
+from src.utils.budget import ledger
+from src.utils.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchState(State):
+    """
+    Base FSM state of the orchestrator: traces each state visit and each agent request,
+    and ends the run early once its token budget is used up.
+    """
+
+    NAME = "RESEARCH_STATE"
+
+    async def on_start(self):
+        self._span = tracer.start_span(self.NAME, category="state", agent=self.agent.name)
+        self._span_token = tracer.activate(self._span)
+
+    async def on_end(self):
+        self._enforce_budget()
+        tracer.deactivate(self._span_token)
+        tracer.end_span(self._span, next_state=self.next_state)
+
+    def _enforce_budget(self):
+        # Import here to avoid circular import
+        from src.states.writing import FinalOutputState
+
+        run = ledger.get_run(self.agent.run_id)
+        if run is None or self.next_state in (None, FinalOutputState.NAME):
+            return
+        # Past the soft budget, stop as soon as there is a report to output
+        if run.hard_exceeded or (run.soft_exceeded and self.agent.current_report):
+            limit = "hard" if run.hard_exceeded else "soft"
+            logger.warning(
+                f"[{self.NAME}] Run {run.run_id} reached its {limit} token budget "
+                f"({run.total_tokens} tokens), moving to {FinalOutputState.NAME}"
+            )
+            self.set_next_state(FinalOutputState.NAME)
+
+    async def request(
+        self,
+        to: str,
+        body: str,
+        timeout: float,
+        accept: Optional[Callable[[Message], bool]] = None,
+    ) -> Optional[Message]:
+        """
+        Send an LLM request to another agent and wait for its reply.
+
+        Args:
+            to: JID of the agent to ask
+            body: Message body
+            timeout: Seconds to wait for each incoming message
+            accept: Optional predicate; replies it rejects are skipped and waiting continues
+
+        Returns:
+            The accepted reply, or None on timeout
+        """
+        msg = Message(to=to)
+        msg.body = body
+        msg.set_metadata("message_type", "llm")
+        # New conversation per request, attributed to the run by its prefix
+        msg.thread = f"{self.agent.run_id}:{uuid.uuid4().hex[:8]}"
+
+        with tracer.span(f"request:{msg.to.local}", category="request", request_bytes=len(body)) as span:
+            await self.send(msg)
+            while True:
+                response = await self.receive(timeout=timeout)
+                if response is not None:
+                    # Large replies arrive as claim checks
+                    response.body = get_blob_store().resolve(response.body)
+                if response is None or accept is None or accept(response):
+                    break
+            if span is not None:
+                span.set(
+                    response_bytes=len(response.body or "") if response else 0,
+                    timed_out=response is None,
+                )
+        return response
@@ -1,13 +1,13 @@
 import json
 import logging
-from spade.behaviour import State
-from spade.message import Message
 from src.config.settings import settings
+from src.states.base import ResearchState
+from src.utils.json_repair import parse_json_object
 
 logger = logging.getLogger(__name__)
 
 
-class DraftPlanState(State):
+class DraftPlanState(ResearchState):
     NAME = "DRAFT_PLAN_STATE"
 
     async def run(self):
@@ -15,29 +15,17 @@ class DraftPlanState(State):
         user_query = self.agent.user_query
         planner_jid = self.agent.planner_jid
 
-        # Send query to Planner Agent
-        msg = Message(to=planner_jid)
-        msg.body = user_query
-        msg.set_metadata("message_type", "llm")
-        await self.send(msg)
-
-        # Wait for response
-        response = await self.receive(timeout=60)
+        # Send query to Planner Agent and wait for response
+        response = await self.request(planner_jid, user_query, timeout=60)
         
         if response:
             logger.debug(f"[DraftPlanState] Received plan: {response.body}")
-            try:
-                # Parse JSON plan
-                clean_body = response.body.strip()
-                if clean_body.startswith("```json"):
-                    clean_body = clean_body.split("```json")[1]
-                if clean_body.endswith("```"):
-                    clean_body = clean_body.rsplit("```", 1)[0]
-                
-                plan = json.loads(clean_body.strip())
+            # Parse JSON plan, repairing fences, prose and truncation instead of asking again
+            plan = parse_json_object(response.body)
+            if plan is not None and isinstance(plan.get("topics"), list):
                 self.agent.current_plan = plan
                 self.set_next_state(WaitForUserValidationState.NAME)
-            except json.JSONDecodeError:
+            else:
                 logger.warning("[DraftPlanState] Failed to parse plan JSON. Retrying...")
                 self.set_next_state(DraftPlanState.NAME)
         else:
@@ -45,24 +33,36 @@ class DraftPlanState(State):
             self.set_next_state(DraftPlanState.NAME)  # Retry
 
 
-class WaitForUserValidationState(State):
+class WaitForUserValidationState(ResearchState):
     NAME = "WAIT_USER_VALIDATION_STATE"
 
     async def run(self):
-        logger.info("[WaitForUserValidationState] Waiting for user validation")
-        print("\n[WaitForUserValidationState] Proposed Plan:")
-        print(json.dumps(self.agent.current_plan, indent=2))
-        
-        choice = await self.agent.input_func("\nApprove plan? (y/n/modify): ")
-        
-        if choice.lower().startswith('y'):
-            # Import here to avoid circular import
-            from src.states.research import ResearchExecutionState
-            self.set_next_state(ResearchExecutionState.NAME)
+        # Import here to avoid circular import
+        from src.states.research import ResearchExecutionState
+
+        if self.agent.approval_policy is not None:
+            # Headless run: the policy approves the plan or returns feedback for the planner
+            feedback = self.agent.approval_policy(self.agent.current_plan, self.agent.plan_revisions)
+            if feedback is None:
+                logger.info("[WaitForUserValidationState] Plan approved by policy")
+                self.set_next_state(ResearchExecutionState.NAME)
+                return
+            logger.info(f"[WaitForUserValidationState] Plan rejected by policy: {feedback}")
         else:
+            logger.info("[WaitForUserValidationState] Waiting for user validation")
+            self.agent.output_func("\n[WaitForUserValidationState] Proposed Plan:")
+            self.agent.output_func(json.dumps(self.agent.current_plan, indent=2))
+            
+            choice = await self.agent.input_func("\nApprove plan? (y/n/modify): ")
+            
+            if choice.lower().startswith('y'):
+                self.set_next_state(ResearchExecutionState.NAME)
+                return
             logger.info("[WaitForUserValidationState] Requesting modification...")
             feedback = await self.agent.input_func("Enter feedback for modification: ")
-            # Update the query with feedback to refine the plan
-            self.agent.user_query = f"Original request: {self.agent.initial_query}\nPrevious Plan: {json.dumps(self.agent.current_plan)}\nFeedback: {feedback}\nPlease update the plan."
-            self.set_next_state(DraftPlanState.NAME)
+
+        self.agent.plan_revisions += 1
+        # Update the query with feedback to refine the plan
+        self.agent.user_query = f"Original request: {self.agent.initial_query}\nPrevious Plan: {json.dumps(self.agent.current_plan, separators=(',', ':'))}\nFeedback: {feedback}\nPlease update the plan."
+        self.set_next_state(DraftPlanState.NAME)
 
@@ -1,58 +1,75 @@
 import json
 import logging
-from spade.behaviour import State
 from spade.message import Message
+from src.states.base import ResearchState
+from src.utils.budget import ledger
+from src.utils.convergence import EvidenceMark, IterationGain, evidence_novelty
 
 logger = logging.getLogger(__name__)
 
 
-class ResearchExecutionState(State):
+class ResearchExecutionState(ResearchState):
     NAME = "RESEARCH_EXECUTION_STATE"
 
     async def run(self):
         logger.info("[ResearchExecutionState] Delegating to Coordinator...")
         coordinator_jid = self.agent.coordinator_jid
         plan = self.agent.current_plan
+        # Baselines for measuring what this iteration adds
+        self.agent.evidence_mark = EvidenceMark.of(self.agent.evidence)
+        self.agent.previous_report = self.agent.current_report
+        known_queries = {topic.get("query") for topic in self.agent.research_topics}
+        self.agent.research_topics.extend(
+            topic for topic in plan.get("topics", []) if isinstance(topic, dict) and topic.get("query") not in known_queries
+        )
         
         # Prompt for Coordinator
         prompt = f"""Please execute the following research plan. 
-        For each topic, use the appropriate sub-agent (arxiv for academic, tavily for general/web).
+        For each topic, use the appropriate sub-agent (arxiv for academic, tavily for general/web, wikipedia for encyclopedic background; tavily if there is no wikipedia sub-agent).
         
         Plan:
-        {json.dumps(plan, indent=2)}
+        {json.dumps(plan, separators=(",", ":"))}
         
         Accumulate all findings and provide a comprehensive 'Research Context' summary.
+        Keep the source ids reported by the sub-agents (e.g. [S3]) next to the findings they support.
         End your response with <TASK_COMPLETE>.
         """
         
-        msg = Message(to=coordinator_jid)
-        msg.body = prompt
-        msg.set_metadata("message_type", "llm")
-        await self.send(msg)
-        
         logger.info("[ResearchExecutionState] Waiting for Coordinator results (this may take time)...")
-
-        final_response = None
-        while True:
-            response = await self.receive(timeout=600)  # 10 minutes
-            if response:
-                logger.debug(f"[ResearchExecutionState] Received: {response.body[:100]}...")
-                normalized_body = response.body.replace(" ", "").upper()
-                if "<TASK_COMPLETE>" in normalized_body or "<TASKCOMPLETE>" in normalized_body or "<END>" in normalized_body or "<DONE>" in normalized_body:
-                    final_response = response.body
-                    break
-                else:
-                    pass
-            else:
-                logger.warning("[ResearchExecutionState] Timed out waiting for Coordinator.")
-                break
+        response = await self.request(coordinator_jid, prompt, timeout=600, accept=self._is_final)  # 10 minutes
         
-        if final_response:
-            self.agent.research_context = final_response
+        if response:
+            # Sources are collected in self.agent.evidence by the sub-agents' tools; this is the coordinator's synthesis
+            self.agent.research_context = response.body
+            self._record_gain()
             # Import here to avoid circular import
             from src.states.writing import DraftReportState
             self.set_next_state(DraftReportState.NAME)
         else:
+            logger.warning("[ResearchExecutionState] Timed out waiting for Coordinator.")
             logger.error("[ResearchExecutionState] Failed to get results.")
             self.set_next_state(ResearchExecutionState.NAME)  # Retry?
 
+    def _record_gain(self):
+        evidence, mark = self.agent.evidence, self.agent.evidence_mark
+        run = ledger.get_run(self.agent.run_id)
+        gain = IterationGain(
+            iteration=len(self.agent.research_gains) + 1,
+            sources_returned=evidence.additions - mark.additions if evidence else 0,
+            new_sources=len(evidence.records) - mark.records if evidence else 0,
+            novelty=round(evidence_novelty(evidence, mark), 3),
+            tokens=run.total_tokens if run else 0,
+        )
+        self.agent.research_gains.append(gain)
+        logger.info(
+            f"[ResearchExecutionState] Iteration {gain.iteration}: {gain.new_sources} new of "
+            f"{gain.sources_returned} returned sources, novelty {gain.novelty}"
+        )
+        if self._span is not None:
+            self._span.set(iteration=gain.iteration, new_sources=gain.new_sources, novelty=gain.novelty)
+
+    @staticmethod
+    def _is_final(response: Message) -> bool:
+        logger.debug(f"[ResearchExecutionState] Received: {response.body[:100]}...")
+        normalized_body = response.body.replace(" ", "").upper()
+        return "<TASK_COMPLETE>" in normalized_body or "<TASKCOMPLETE>" in normalized_body or "<END>" in normalized_body or "<DONE>" in normalized_body
@@ -1,40 +1,53 @@
-import json
 import logging
-from spade.behaviour import State
-from spade.message import Message
+from src.config.settings import settings
+from src.states.base import ResearchState
+from src.utils.json_repair import parse_json_object
+from src.utils.report_checks import PASS, FAIL, check_report
+from src.utils.convergence import has_converged, report_change
+from src.utils.blob_store import get_blob_store
 
 logger = logging.getLogger(__name__)
 
 
-class DraftReportState(State):
+class DraftReportState(ResearchState):
     NAME = "DRAFT_REPORT_STATE"
 
     async def run(self):
         logger.info("[DraftReportState] Drafting report...")
         writer_jid = self.agent.writer_jid
         context = self.agent.research_context
+        sources = self.agent.evidence.to_prompt() if self.agent.evidence else ""
+        # Large parts travel as claim checks; unchanged ones keep their reference across rewrites and iterations
+        blobs = get_blob_store()
         
         prompt = f"""Based on the following Research Context, please write a comprehensive report.
+        Cite sources by their ids, e.g. [S1].
+        
+        Sources:
+        {blobs.reference(sources) or "No sources were recorded."}
         
         Research Context:
-        {context}
+        {blobs.reference(context)}
+        """
+        if self.agent.report_feedback:
+            prompt += f"""
+        A previous draft was rejected. Fix these problems: {self.agent.report_feedback}
         """
         
-        msg = Message(to=writer_jid)
-        msg.body = prompt
-        msg.set_metadata("message_type", "llm")
-        await self.send(msg)
-        
-        response = await self.receive(timeout=120)
+        response = await self.request(writer_jid, prompt, timeout=120)
         if response:
             self.agent.current_report = response.body
+            self.agent.report_feedback = None
+            if self.agent.research_gains:
+                gain = self.agent.research_gains[-1]
+                gain.report_change = round(report_change(self.agent.previous_report, response.body), 3)
             self.set_next_state(ReviewReportState.NAME)
         else:
             logger.warning("[DraftReportState] Timeout waiting for writer.")
             self.set_next_state(DraftReportState.NAME)
 
 
-class ReviewReportState(State):
+class ReviewReportState(ResearchState):
     NAME = "REVIEW_REPORT_STATE"
 
     async def run(self):
@@ -43,71 +56,110 @@ class ReviewReportState(State):
         report = self.agent.current_report
         original_query = self.agent.user_query
         
+        check = None
+        if settings.REPORT_PRECHECK_ENABLED:
+            check = self._precheck(report)
+            if check.verdict == PASS:
+                logger.info("[ReviewReportState] Report passed the pre-check, skipping the critic")
+                self.set_next_state(FinalOutputState.NAME)
+                return
+            if check.verdict == FAIL and self.agent.report_rewrites < settings.REPORT_MAX_REWRITES:
+                logger.info(f"[ReviewReportState] Report failed the pre-check, asking for a rewrite: {check.problems}")
+                self.agent.report_rewrites += 1
+                self.agent.report_feedback = " ".join(check.problems)
+                self.set_next_state(DraftReportState.NAME)
+                return
+        
         prompt = f"""Please critique the following report based on the original query.
         
         Original Query: {original_query}
         
         Report:
-        {report}
+        {get_blob_store().reference(report)}
+        """
+        if check is not None and check.problems:
+            prompt += f"""
+        Automatic checks flagged: {" ".join(check.problems)}
         """
         
-        msg = Message(to=critic_jid)
-        msg.body = prompt
-        msg.set_metadata("message_type", "llm")
-        await self.send(msg)
-        
-        response = await self.receive(timeout=60)
+        response = await self.request(critic_jid, prompt, timeout=60)
         if response:
-            try:
-                # Clean JSON
-                clean_body = response.body.strip()
-                if clean_body.startswith("```json"):
-                    clean_body = clean_body.split("```json")[1]
-                if clean_body.endswith("```"):
-                    clean_body = clean_body.rsplit("```", 1)[0]
-                    
-                feedback_json = json.loads(clean_body.strip())
-                
-                if feedback_json.get("status") == "SUFFICIENT":
-                    logger.info("[ReviewReportState] Report approved!")
-                    self.set_next_state(FinalOutputState.NAME)
-                else:
-                    logger.info(f"[ReviewReportState] Report insufficient. Feedback: {feedback_json.get('feedback')}")
-                    missing = feedback_json.get("missing_information", [])
-                    if missing:
-                        # Create a remedial plan
-                        new_plan = {
-                            "research_goal": "Address missing information",
-                            "topics": [
-                                {"topic_id": f"missing_{i}", "query": topic, "source": "tavily", "description": "Gap filling"}
-                                for i, topic in enumerate(missing)
-                            ]
-                        }
-                        logger.info(f"[ReviewReportState] Generating new research tasks: {missing}")
-                        self.agent.current_plan = new_plan  # Update plan for next cycle
-                        # Import here to avoid circular import
-                        from src.states.research import ResearchExecutionState
-                        self.set_next_state(ResearchExecutionState.NAME)
-                    else:
-                        # If insufficient but no specific missing info, maybe just retry writing?
-                        # Or force final output to avoid infinite loops if critic is picky
-                        logger.warning("[ReviewReportState] No specific missing info provided, accepting report with warning.")
-                        self.set_next_state(FinalOutputState.NAME)
-                        
-            except json.JSONDecodeError:
+            feedback_json = parse_json_object(response.body)
+            if feedback_json is None:
                 logger.error("[ReviewReportState] Failed to parse critic response.")
                 self.set_next_state(FinalOutputState.NAME)  # Fail open
+            elif feedback_json.get("status") == "SUFFICIENT":
+                logger.info("[ReviewReportState] Report approved!")
+                self.set_next_state(FinalOutputState.NAME)
+            else:
+                logger.info(f"[ReviewReportState] Report insufficient. Feedback: {feedback_json.get('feedback')}")
+                missing = feedback_json.get("missing_information", [])
+                if missing and self._converged():
+                    self.set_next_state(FinalOutputState.NAME)
+                elif missing:
+                    # Create a remedial plan
+                    new_plan = {
+                        "research_goal": "Address missing information",
+                        "topics": [
+                            {"topic_id": f"missing_{i}", "query": topic, "source": "tavily", "description": "Gap filling"}
+                            for i, topic in enumerate(missing)
+                        ]
+                    }
+                    logger.info(f"[ReviewReportState] Generating new research tasks: {missing}")
+                    self.agent.current_plan = new_plan  # Update plan for next cycle
+                    # Import here to avoid circular import
+                    from src.states.research import ResearchExecutionState
+                    self.set_next_state(ResearchExecutionState.NAME)
+                else:
+                    # If insufficient but no specific missing info, maybe just retry writing?
+                    # Or force final output to avoid infinite loops if critic is picky
+                    logger.warning("[ReviewReportState] No specific missing info provided, accepting report with warning.")
+                    self.set_next_state(FinalOutputState.NAME)
         else:
             self.set_next_state(FinalOutputState.NAME)
 
+    def _converged(self) -> bool:
+        gains = self.agent.research_gains
+        # The first iteration has nothing to be compared with
+        if len(gains) < 2:
+            return False
+        gain = gains[-1]
+        if has_converged(gain, settings.CONVERGENCE_MIN_NOVELTY, settings.CONVERGENCE_MIN_REPORT_CHANGE):
+            logger.info(
+                f"[ReviewReportState] Research converged (novelty {gain.novelty}, report change {gain.report_change}), "
+                "accepting the report instead of another iteration"
+            )
+            return True
+        return False
+
+    def _precheck(self, report: str):
+        check = check_report(
+            report,
+            self.agent.research_topics,
+            self.agent.evidence,
+            required_sections=settings.REPORT_REQUIRED_SECTIONS,
+            min_words=settings.REPORT_MIN_WORDS,
+            pass_coverage=settings.REPORT_PASS_COVERAGE,
+            fail_coverage=settings.REPORT_FAIL_COVERAGE,
+            pass_citation_ratio=settings.REPORT_PASS_CITATION_RATIO,
+        )
+        self.agent.report_check = check
+        logger.info(
+            f"[ReviewReportState] Pre-check {check.verdict}: coverage {check.topic_coverage}, "
+            f"cited {check.cited_sources}/{check.total_sources} sources, {check.words} words"
+        )
+        if self._span is not None:
+            self._span.set(precheck=check.verdict, topic_coverage=check.topic_coverage, cited_sources=check.cited_sources)
+        return check
+
 
-class FinalOutputState(State):
+class FinalOutputState(ResearchState):
     NAME = "FINAL_OUTPUT_STATE"
 
     async def run(self):
-        print("\n" + "="*60)
-        print("FINAL RESEARCH REPORT")
-        print("="*60)
-        print(self.agent.current_report)
-        print("="*60)
+        self.agent.output_func("\n" + "="*60)
+        self.agent.output_func("FINAL RESEARCH REPORT")
+        self.agent.output_func("="*60)
+        self.agent.output_func(self.agent.current_report or "No report was produced before the token budget ran out.")
+        self.agent.output_func("="*60)
 
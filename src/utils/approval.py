@@ -0,0 +1,74 @@
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with (plan, revision). Returns None to approve the plan, or feedback to request a new one.
+ApprovalPolicy = Callable[[Dict[str, Any], int], Optional[str]]
+
+
+def approve_all(plan: Dict[str, Any], revision: int) -> Optional[str]:
+    """Approve every plan as proposed."""
+    return None
+
+
+class PlanRulesPolicy:
+    """
+    Approves plans that satisfy simple structural rules and sends the others
+    back to the planner with feedback.
+
+    After max_revisions rejected drafts the plan is approved anyway, so an
+    unattended run can never loop on planning.
+    """
+
+    def __init__(
+        self,
+        min_topics: int = 1,
+        max_topics: int = 6,
+        allowed_sources: Iterable[str] = ("arxiv", "tavily", "wikipedia"),
+        max_revisions: int = 2,
+    ):
+        self.min_topics = min_topics
+        self.max_topics = max_topics
+        self.allowed_sources = set(allowed_sources)
+        self.max_revisions = max_revisions
+
+    def __call__(self, plan: Dict[str, Any], revision: int) -> Optional[str]:
+        problems = []
+        topics = plan.get("topics") or []
+        if len(topics) < self.min_topics:
+            problems.append(f"The plan needs at least {self.min_topics} topics.")
+        if len(topics) > self.max_topics:
+            problems.append(f"The plan has {len(topics)} topics; keep the {self.max_topics} most relevant.")
+        sources = {topic.get("source") for topic in topics if isinstance(topic, dict)}
+        unknown = sources - self.allowed_sources
+        if unknown:
+            problems.append(
+                f"Unsupported sources: {', '.join(sorted(str(s) for s in unknown))}. "
+                f"Use only: {', '.join(sorted(self.allowed_sources))}."
+            )
+
+        if not problems:
+            return None
+        if revision >= self.max_revisions:
+            logger.warning(f"Approving plan after {revision} revisions despite: {' '.join(problems)}")
+            return None
+        return " ".join(problems)
+
+
+def create_approval_policy(name: str, **kwargs) -> ApprovalPolicy:
+    """
+    Create an approval policy by name.
+
+    Args:
+        name: "auto" (approve every plan) or "rules" (PlanRulesPolicy)
+        **kwargs: Options for PlanRulesPolicy
+
+    Returns:
+        The policy
+    """
+    if name == "auto":
+        return approve_all
+    if name == "rules":
+        return PlanRulesPolicy(**kwargs)
+    raise ValueError(f"Unknown approval policy: {name}")
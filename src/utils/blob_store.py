@@ -0,0 +1,234 @@
+import os
+import re
+import zlib
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from spade_llm.guardrails import GuardrailAction, GuardrailResult, InputGuardrail, OutputGuardrail
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Claim check placed in a message body instead of the payload
+_REFERENCE_RE = re.compile(r"\[\[blob:([0-9a-f]{64})\]\]")
+
+
+def reference_for(digest: str) -> str:
+    return f"[[blob:{digest}]]"
+
+
+class BlobStore:
+    """
+    Local content-addressed store for large message payloads (claim checks).
+
+    Payloads are stored once, zlib-compressed, under the SHA-256 of their
+    text; putting the same text again only returns its reference. Agents on
+    the same host exchange the reference and resolve it when they need the
+    text. Recently read payloads are kept decompressed in a small LRU cache.
+
+    Blobs are shared by every run and process using the directory, so they
+    are not deleted when a run ends; evict() removes the ones not stored
+    for max_age seconds, then the oldest ones while the store is larger
+    than max_bytes. Storing a payload again marks its blob as fresh.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        threshold: int = 4096,
+        cache_size: int = 32,
+        max_age: float = 86400,
+        max_bytes: int = 0,
+    ):
+        """
+        Args:
+            directory: Where blobs are stored
+            threshold: Payloads larger than this many bytes are replaced by a reference (0 = never)
+            cache_size: Decompressed payloads kept in memory
+            max_age: Seconds after which evict() removes a blob not stored again (0 = never)
+            max_bytes: Size of the stored blobs above which evict() removes the oldest (0 = no limit)
+        """
+        self.directory = directory
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_stored = 0
+        self.bytes_referenced = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest[2:]}.z")
+
+    def _remember(self, digest: str, text: str):
+        with self._lock:
+            self._cache[digest] = text
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, text: str) -> str:
+        """
+        Store a payload if it is not stored yet.
+
+        Returns:
+            The payload's digest
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed = zlib.compress(data, 6)
+            # Unique temporary name: several agents may store the same payload at once
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.bytes_stored += len(compressed)
+        else:
+            try:
+                # Referenced again: keep it out of the next eviction
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted meanwhile
+                return self.put(text)
+        self._remember(digest, text)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        """Return a stored payload, or None if it is unknown."""
+        with self._lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                return text
+        try:
+            with open(self._path(digest), "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+        except FileNotFoundError:
+            return None
+        self._remember(digest, text)
+        return text
+
+    def reference(self, text: Optional[str]) -> Optional[str]:
+        """Replace a payload above the threshold by its claim check; smaller payloads are returned as is."""
+        if not text or not self.threshold or len(text.encode("utf-8")) <= self.threshold:
+            return text
+        reference = reference_for(self.put(text))
+        with self._lock:
+            self.bytes_referenced += len(text) - len(reference)
+        return reference
+
+    def resolve(self, text: Optional[str]) -> Optional[str]:
+        """Replace every claim check in the text by its payload. Unknown references are left in place."""
+        if not text or "[[blob:" not in text:
+            return text
+
+        def payload(match: re.Match) -> str:
+            stored = self.get(match.group(1))
+            if stored is None:
+                logger.error(f"Blob {match.group(1)} is not in the store at {self.directory}")
+                return match.group(0)
+            return stored
+
+        return _REFERENCE_RE.sub(payload, text)
+
+    def _blobs(self) -> List[Tuple[float, int, str]]:
+        """(modification time, size, path) of every stored blob, oldest first."""
+        blobs = []
+        if not os.path.isdir(self.directory):
+            return blobs
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.name.endswith(".z"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, entry.path))
+        blobs.sort()
+        return blobs
+
+    def evict(self) -> int:
+        """
+        Delete blobs older than max_age, then the oldest blobs while the store exceeds max_bytes.
+
+        Scans the directory, so call it between runs (in a thread from async code).
+
+        Returns:
+            Number of blobs deleted
+        """
+        if not self.max_age and not self.max_bytes:
+            return 0
+        blobs = self._blobs()
+        total = sum(size for _, size, _ in blobs)
+        cutoff = time.time() - self.max_age if self.max_age else None
+        evicted = 0
+        for mtime, size, path in blobs:
+            expired = cutoff is not None and mtime < cutoff
+            if not expired and (not self.max_bytes or total <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+            digest = os.path.basename(os.path.dirname(path)) + os.path.basename(path)[:-2]
+            with self._lock:
+                self._cache.pop(digest, None)
+        if evicted:
+            logger.info(f"Evicted {evicted} blobs from {self.directory}, {total} bytes left")
+        return evicted
+
+
+_blob_store = None
+
+def get_blob_store() -> BlobStore:
+    """Create the shared blob store on first use, from the BLOB_* settings."""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore(
+            settings.BLOB_STORE_DIR,
+            settings.BLOB_THRESHOLD_BYTES,
+            max_age=settings.BLOB_MAX_AGE_SECONDS,
+            max_bytes=settings.BLOB_MAX_BYTES,
+        )
+    return _blob_store
+
+
+class ResolveBlobsGuardrail(InputGuardrail):
+    """Expands claim checks in an incoming message before the LLM sees it."""
+
+    def __init__(self, store: Optional[BlobStore] = None):
+        super().__init__("resolve_blobs")
+        self.store = store
+
+    async def check(self, content: str, context: Dict[str, Any]) -> GuardrailResult:
+        resolved = (self.store or get_blob_store()).resolve(content)
+        if resolved == content:
+            return GuardrailResult(action=GuardrailAction.PASS, content=content)
+        return GuardrailResult(action=GuardrailAction.MODIFY, content=resolved, reason="Resolved claim checks")
+
+
+class ClaimCheckGuardrail(OutputGuardrail):
+    """Replaces a large LLM response by a claim check before it is sent."""
+
+    def __init__(self, store: Optional[BlobStore] = None):
+        super().__init__("claim_check")
+        self.store = store
+
+    async def check(self, content: str, context: Dict[str, Any]) -> GuardrailResult:
+        reference = (self.store or get_blob_store()).reference(content)
+        if reference == content:
+            return GuardrailResult(action=GuardrailAction.PASS, content=content)
+        return GuardrailResult(action=GuardrailAction.MODIFY, content=reference, reason="Stored response as blob")
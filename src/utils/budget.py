@@ -0,0 +1,171 @@
+import time
+import logging
+import threading
+import contextvars
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from spade_llm.providers.base_provider import BaseLLMProvider
+from src.utils.tokens import estimate_prompt_tokens, estimate_response_tokens
+
+logger = logging.getLogger(__name__)
+
+# Conversation of the last LLM call made in this task. LLM calls made by tools
+# (e.g. page summaries) pass no conversation id and are charged to it.
+_conversation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("metered_conversation", default=None)
+
+BUDGET_EXHAUSTED_RESPONSE = "The token budget for this research run is exhausted. <DONE>"
+
+
+@dataclass
+class AgentUsage:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class RunUsage:
+    run_id: str
+    soft_limit: int = 0
+    hard_limit: int = 0
+    agents: Dict[str, AgentUsage] = field(default_factory=dict)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(usage.total_tokens for usage in self.agents.values())
+
+    @property
+    def calls(self) -> int:
+        return sum(usage.calls for usage in self.agents.values())
+
+    @property
+    def soft_exceeded(self) -> bool:
+        return self.soft_limit > 0 and self.total_tokens >= self.soft_limit
+
+    @property
+    def hard_exceeded(self) -> bool:
+        return self.hard_limit > 0 and self.total_tokens >= self.hard_limit
+
+
+class TokenLedger:
+    """
+    Per-run, per-agent token and call counters.
+
+    LLM calls are attributed to a run through their conversation id: a
+    conversation belongs to run R if its id is R or starts with "R:". The
+    orchestrator tags its requests with such thread ids and the coordinator
+    derives the sub-agent session from them, so every hop of a run is
+    charged to it. Calls that match no open run are kept as unattributed.
+    """
+
+    def __init__(self):
+        self.runs: Dict[str, RunUsage] = {}
+        self.unattributed: Dict[str, AgentUsage] = {}
+        self._lock = threading.Lock()
+
+    def open_run(self, run_id: str, soft_limit: int = 0, hard_limit: int = 0) -> RunUsage:
+        """
+        Start counting tokens for a run.
+
+        Args:
+            run_id: Run id, also the prefix of the run's conversation ids
+            soft_limit: Tokens after which the run should wrap up (0 = no limit)
+            hard_limit: Tokens after which LLM calls of the run are refused (0 = no limit)
+
+        Returns:
+            The run's usage record
+        """
+        run = RunUsage(run_id=run_id, soft_limit=soft_limit, hard_limit=hard_limit)
+        with self._lock:
+            self.runs[run_id] = run
+        return run
+
+    def close_run(self, run_id: str) -> Optional[RunUsage]:
+        """Stop counting tokens for a run and return its final usage."""
+        with self._lock:
+            return self.runs.pop(run_id, None)
+
+    def get_run(self, run_id: str) -> Optional[RunUsage]:
+        return self.runs.get(run_id)
+
+    def run_for(self, conversation_id: Optional[str]) -> Optional[RunUsage]:
+        """Find the open run a conversation belongs to."""
+        if not conversation_id:
+            return None
+        run_id = conversation_id.split(":", 1)[0]
+        return self.runs.get(run_id)
+
+    def record(self, agent: str, conversation_id: Optional[str], prompt_tokens: int, completion_tokens: int):
+        run = self.run_for(conversation_id)
+        with self._lock:
+            usages = run.agents if run is not None else self.unattributed
+            usage = usages.setdefault(agent, AgentUsage())
+            usage.calls += 1
+            usage.prompt_tokens += prompt_tokens
+            usage.completion_tokens += completion_tokens
+
+    def format_summary(self, run: RunUsage) -> str:
+        """
+        Format a run's usage as a text table.
+
+        Args:
+            run: Usage record returned by open_run or close_run
+
+        Returns:
+            Table with one row per agent and a total row
+        """
+        limits = f"soft limit {run.soft_limit or 'none'}, hard limit {run.hard_limit or 'none'}"
+        lines = [
+            f"Token usage for run {run.run_id} ({limits}, {time.monotonic() - run.started:.1f}s)",
+            f"{'Agent':<20}{'Calls':>8}{'Prompt':>12}{'Completion':>12}{'Total':>12}",
+        ]
+        for agent, usage in sorted(run.agents.items()):
+            lines.append(
+                f"{agent:<20}{usage.calls:>8}{usage.prompt_tokens:>12}{usage.completion_tokens:>12}{usage.total_tokens:>12}"
+            )
+        prompt = sum(usage.prompt_tokens for usage in run.agents.values())
+        completion = sum(usage.completion_tokens for usage in run.agents.values())
+        lines.append(f"{'TOTAL':<20}{run.calls:>8}{prompt:>12}{completion:>12}{run.total_tokens:>12}")
+        return "\n".join(lines)
+
+
+ledger = TokenLedger()
+
+
+class MeteredProvider(BaseLLMProvider):
+    """
+    LLM provider wrapper that charges every call to the run it belongs to.
+
+    Once a run has reached its hard budget, calls for it are not sent to the
+    model; a short final answer is returned instead so the run can finish.
+    """
+
+    def __init__(self, provider: BaseLLMProvider, agent_name: str, token_ledger: Optional[TokenLedger] = None):
+        super().__init__()
+        self.provider = provider
+        self.agent_name = agent_name
+        self.ledger = token_ledger or ledger
+
+    def __getattr__(self, name):
+        # Expose wrapped provider attributes such as model or base_url
+        return getattr(self.provider, name)
+
+    async def get_llm_response(self, context, tools=None, conversation_id=None, output_schema=None) -> Dict[str, Any]:
+        if conversation_id:
+            _conversation.set(conversation_id)
+        charged_to = conversation_id or _conversation.get()
+
+        run = self.ledger.run_for(charged_to)
+        if run is not None and run.hard_exceeded:
+            logger.warning(f"[{self.agent_name}] Hard token budget of run {run.run_id} reached, skipping LLM call")
+            return {"text": BUDGET_EXHAUSTED_RESPONSE, "tool_calls": [], "structured": None}
+
+        prompt_tokens = estimate_prompt_tokens(context.get_prompt(conversation_id))
+        response = await self.provider.get_llm_response(context, tools, conversation_id, output_schema)
+        self.ledger.record(self.agent_name, charged_to, prompt_tokens, estimate_response_tokens(response))
+        return response
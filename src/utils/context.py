@@ -0,0 +1,185 @@
+import logging
+from importlib.metadata import version
+from typing import Any, Dict, List, Optional
+from spade.behaviour import CyclicBehaviour
+from spade.message import Message
+from spade.template import Template
+from spade_llm.context.management import ContextManagement
+from src.utils.tokens import estimate_prompt_tokens, estimate_tokens, CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+RELEASE_MESSAGE_TYPE = "release_run"
+
+
+def belongs_to_run(conversation_id: str, run_id: str) -> bool:
+    return conversation_id == run_id or conversation_id.startswith(f"{run_id}:")
+
+
+class TokenBudgetContext(ContextManagement):
+    """
+    Keeps a conversation's prompt under a token threshold.
+
+    Oversized messages (typically tool results) are clipped first. If the
+    conversation is still too long, the first message (the task) is kept
+    and the oldest messages after it are dropped and replaced by a short
+    note. Tool calls and their results are dropped together, so the prompt
+    never holds a tool result without its call. The stored history is not
+    modified.
+    """
+
+    def __init__(self, max_tokens: int = 24000, max_message_tokens: int = 4000):
+        """
+        Args:
+            max_tokens: Prompt size above which history is compacted
+            max_message_tokens: Size above which a single message is clipped (0 = never clip)
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be greater than 0")
+        self.max_tokens = max_tokens
+        self.max_message_tokens = max_message_tokens
+        self._last_stats: Dict[str, Any] = {}
+
+    def apply_context_strategy(self, messages: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+        budget = self.max_tokens - estimate_tokens(system_prompt)
+        messages = [self._clip(message) for message in messages]
+        if estimate_prompt_tokens(messages) <= budget or len(messages) <= 2:
+            self._last_stats = {"messages_dropped": 0}
+            return messages
+
+        head, tail = messages[:1], messages[1:]
+        groups = self._group_tool_calls(tail)
+        kept: List[List[Dict[str, Any]]] = []
+        used = estimate_prompt_tokens(head)
+        for group in reversed(groups):
+            size = estimate_prompt_tokens(group)
+            if kept and used + size > budget:
+                break
+            kept.insert(0, group)
+            used += size
+
+        kept_messages = [message for group in kept for message in group]
+        dropped = len(tail) - len(kept_messages)
+        self._last_stats = {"messages_dropped": dropped}
+        if not dropped:
+            return messages
+
+        logger.debug(f"Compacted conversation: dropped {dropped} of {len(messages)} messages")
+        note = {"role": "user", "content": f"[{dropped} earlier messages omitted to fit the context budget]"}
+        return head + [note] + kept_messages
+
+    def _clip(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        content = message.get("content")
+        limit = self.max_message_tokens * CHARS_PER_TOKEN
+        if not self.max_message_tokens or not isinstance(content, str) or len(content) <= limit:
+            return message
+        clipped = dict(message)
+        clipped["content"] = f"{content[:limit]}\n[... {len(content) - limit} characters omitted]"
+        return clipped
+
+    @staticmethod
+    def _group_tool_calls(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group each assistant tool-call message with the tool results that follow it."""
+        groups: List[List[Dict[str, Any]]] = []
+        for message in messages:
+            if message.get("role") == "tool" and groups and groups[-1][0].get("tool_calls"):
+                groups[-1].append(message)
+            else:
+                groups.append([message])
+        return groups
+
+    def get_stats(self, total_messages: int) -> Dict[str, Any]:
+        dropped = self._last_stats.get("messages_dropped", 0)
+        return {
+            "strategy": "token_budget",
+            "max_tokens": self.max_tokens,
+            "total_messages": total_messages,
+            "messages_in_context": total_messages - dropped,
+            "messages_dropped": dropped,
+        }
+
+
+def create_context_management(max_tokens: int, max_message_tokens: int) -> Optional[TokenBudgetContext]:
+    """Create the compaction strategy for an agent, or None if max_tokens is 0."""
+    if max_tokens <= 0:
+        return None
+    return TokenBudgetContext(max_tokens, max_message_tokens)
+
+
+def release_message(to: str, run_id: str) -> Message:
+    """Create the message that tells an agent a research run is over."""
+    msg = Message(to=to)
+    msg.thread = run_id
+    msg.body = run_id
+    msg.set_metadata("message_type", RELEASE_MESSAGE_TYPE)
+    return msg
+
+
+class ReleaseRunBehaviour(CyclicBehaviour):
+    async def run(self):
+        msg = await self.receive(timeout=10)
+        if msg:
+            await self.agent.release_run(msg.body)
+
+
+class RunReleaseMixin:
+    """
+    LLMAgent mixin that frees a research run's conversations when the orchestrator
+    sends a release message at the end of the run.
+    """
+
+    async def setup(self):
+        _check_spade_llm_version()
+        await super().setup()
+        template = Template()
+        template.set_metadata("message_type", RELEASE_MESSAGE_TYPE)
+        self.add_behaviour(ReleaseRunBehaviour(), template)
+
+    async def release_run(self, run_id: str) -> int:
+        """
+        Drop the context and conversation state of every conversation of a run.
+
+        Args:
+            run_id: Run whose conversations ("<run_id>" or "<run_id>:...") are released
+
+        Returns:
+            Number of conversations released
+        """
+        conversations = [c for c in _conversation_ids(self) if belongs_to_run(c, run_id)]
+        for conversation_id in conversations:
+            self.context.clear(conversation_id)
+            _drop_conversation(self, conversation_id)
+
+        if conversations:
+            logger.info(f"[{self.name}] Released {len(conversations)} conversations of run {run_id}")
+        return len(conversations)
+
+
+# spade_llm release whose private conversation stores _conversation_ids and _drop_conversation use
+SPADE_LLM_VERSION = "0.3"
+
+
+def _check_spade_llm_version():
+    installed = version("spade_llm")
+    if installed != SPADE_LLM_VERSION and not installed.startswith(f"{SPADE_LLM_VERSION}."):
+        raise RuntimeError(
+            f"RunReleaseMixin supports spade_llm {SPADE_LLM_VERSION}.x, found {installed}; "
+            "check _conversation_ids and _drop_conversation against the new ContextManager and LLMBehaviour"
+        )
+
+
+def _conversation_ids(agent) -> List[str]:
+    """Every conversation the agent holds, including finished ones (get_active_conversations skips those)."""
+    return list(agent.context._conversations) + [
+        c for c in agent.llm_behaviour._active_conversations if c not in agent.context._conversations
+    ]
+
+
+def _drop_conversation(agent, conversation_id: str):
+    """
+    Forget a conversation entirely. spade_llm can only empty a context
+    (ContextManager.clear) or restart a conversation
+    (LLMBehaviour.reset_conversation), both of which keep its entry.
+    """
+    agent.context._conversations.pop(conversation_id, None)
+    agent.llm_behaviour._active_conversations.pop(conversation_id, None)
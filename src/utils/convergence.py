@@ -0,0 +1,86 @@
+import difflib
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from src.utils.rerank import tokenize
+from src.utils.evidence import EvidenceStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IterationGain:
+    """What one research iteration added to the run."""
+
+    iteration: int
+    sources_returned: int = 0
+    new_sources: int = 0
+    novelty: float = 1.0
+    report_change: Optional[float] = None
+    tokens: int = 0
+
+
+@dataclass
+class EvidenceMark:
+    """Position of an evidence store before an iteration."""
+
+    records: int
+    additions: int
+
+    @classmethod
+    def of(cls, store: Optional[EvidenceStore]) -> "EvidenceMark":
+        if store is None:
+            return cls(0, 0)
+        return cls(len(store.records), store.additions)
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def evidence_novelty(store: Optional[EvidenceStore], mark: EvidenceMark) -> float:
+    """
+    Share of new information among the sources returned since the mark.
+
+    Each new record counts as 1 minus its highest word overlap (Jaccard) with
+    the records gathered before; sources that were deduplicated count as 0.
+
+    Returns:
+        Novelty between 0 and 1 (0 when nothing was returned)
+    """
+    if store is None:
+        return 0.0
+    returned = store.additions - mark.additions
+    if returned <= 0:
+        return 0.0
+    previous = [set(tokenize(record.summary)) for record in store.records[:mark.records]]
+    novelty = 0.0
+    for record in store.records[mark.records:]:
+        terms = set(tokenize(record.summary))
+        novelty += 1 - max((_jaccard(terms, old) for old in previous), default=0.0)
+    return min(1.0, novelty / returned)
+
+
+def report_change(previous: Optional[str], current: Optional[str]) -> float:
+    """Share of the report that changed between two drafts (1 - difflib word similarity)."""
+    if not previous:
+        return 1.0
+    matcher = difflib.SequenceMatcher(None, previous.split(), (current or "").split())
+    return 1 - matcher.ratio()
+
+
+def has_converged(gain: IterationGain, min_novelty: float, min_report_change: float) -> bool:
+    """
+    Whether another research iteration is unlikely to pay off: the last one
+    brought too little new evidence or changed the report too little.
+
+    Args:
+        gain: Gains of the last iteration
+        min_novelty: Evidence novelty under which the loop stops (0 disables)
+        min_report_change: Report change under which the loop stops (0 disables)
+    """
+    if min_novelty and gain.novelty < min_novelty:
+        return True
+    if min_report_change and gain.report_change is not None and gain.report_change < min_report_change:
+        return True
+    return False
@@ -0,0 +1,86 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+from spade_llm.providers.base_provider import BaseLLMProvider
+from src.utils.json_repair import parse_json_object
+
+logger = logging.getLogger(__name__)
+
+# Called with the response text. Returns True if the output is usable.
+OutputValidator = Callable[[Optional[str]], bool]
+
+
+def has_text(text: Optional[str]) -> bool:
+    return bool(text and text.strip())
+
+
+def is_research_plan(text: Optional[str]) -> bool:
+    """Whether the text holds a plan DraftPlanState can use."""
+    plan = parse_json_object(text)
+    return plan is not None and isinstance(plan.get("topics"), list)
+
+
+def is_critic_review(text: Optional[str]) -> bool:
+    """Whether the text holds a verdict ReviewReportState can use."""
+    review = parse_json_object(text)
+    return review is not None and review.get("status") in ("SUFFICIENT", "INSUFFICIENT")
+
+
+def response_output(response: Dict[str, Any]) -> Optional[str]:
+    """
+    The final answer of a provider response as text, for validation.
+
+    With an output schema the answer comes back parsed in "structured" and
+    "text" is None, so the structured value is dumped to JSON.
+
+    Examples:
+        >>> from src.config.schemas import CriticReview
+        >>> review = CriticReview(status="SUFFICIENT", feedback="Complete")
+        >>> is_critic_review(response_output({"text": None, "tool_calls": [], "structured": review}))
+        True
+        >>> response_output({"text": None, "tool_calls": [], "structured": {"topics": []}})
+        '{"topics": []}'
+        >>> is_research_plan(response_output({"text": "no plan", "tool_calls": [], "structured": None}))
+        False
+    """
+    structured = response.get("structured")
+    if structured is None:
+        return response.get("text")
+    if hasattr(structured, "model_dump_json"):
+        return structured.model_dump_json()
+    return json.dumps(structured)
+
+
+class EscalatingProvider(BaseLLMProvider):
+    """
+    LLM provider that answers with a small model and escalates to a larger
+    one when the small model's output fails validation.
+
+    Responses with tool calls are returned as they are: only final answers
+    are validated, structured ones through their JSON (see response_output). The larger model sees the same prompt; the rejected
+    answer is not added to the conversation.
+    """
+
+    def __init__(self, primary: BaseLLMProvider, fallback: BaseLLMProvider, validator: OutputValidator, agent_name: str):
+        super().__init__()
+        self.provider = primary
+        self.fallback = fallback
+        self.validator = validator
+        self.agent_name = agent_name
+        self.escalations = 0
+
+    def __getattr__(self, name):
+        # Expose primary provider attributes such as model or base_url
+        return getattr(self.provider, name)
+
+    async def get_llm_response(self, context, tools=None, conversation_id=None, output_schema=None) -> Dict[str, Any]:
+        response = await self.provider.get_llm_response(context, tools, conversation_id, output_schema)
+        if response.get("tool_calls") or self.validator(response_output(response)):
+            return response
+
+        self.escalations += 1
+        logger.warning(
+            f"[{self.agent_name}] Output of {getattr(self.provider, 'model', 'primary model')} failed validation, "
+            f"escalating to {getattr(self.fallback, 'model', 'fallback model')}"
+        )
+        return await self.fallback.get_llm_response(context, tools, conversation_id, output_schema)
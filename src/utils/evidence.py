@@ -0,0 +1,181 @@
+import re
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def content_hash(text: str) -> str:
+    """Hash of the text with case and whitespace normalized, for spotting the same content under another URL."""
+    return hashlib.sha1(_normalize(text).lower().encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(slots=True)
+class EvidenceRecord:
+    id: str
+    source: str
+    locator: str
+    topic: str
+    summary: str
+    hash: str
+    title: str = ""
+
+    def to_prompt_line(self) -> str:
+        title = f" {self.title} -" if self.title else ""
+        return f"[{self.id}] ({self.source}){title} {self.locator} | {self.topic}: {self.summary}"
+
+
+class EvidenceStore:
+    """
+    Sources found during one research run, with stable citation ids.
+
+    Records are deduplicated on insertion: a locator (URL or arXiv id) is
+    stored once, keeping its most informative summary, and a summary whose
+    content is already stored under another locator is not added again.
+    Ids (S1, S2, ...) never change once assigned, so the writer can cite
+    them across research iterations.
+    """
+
+    def __init__(self, max_summary_chars: int = 1200):
+        """
+        Args:
+            max_summary_chars: Summaries are clipped to this length (0 = no limit)
+        """
+        self.max_summary_chars = max_summary_chars
+        self.records: List[EvidenceRecord] = []
+        # Sources offered to the store, including duplicates
+        self.additions = 0
+        self._by_locator: Dict[str, EvidenceRecord] = {}
+        self._by_hash: Dict[str, EvidenceRecord] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, source: str, locator: str, topic: str, summary: str, title: str = "") -> Optional[EvidenceRecord]:
+        """
+        Add a source unless it is already stored.
+
+        Args:
+            source: Where it was found, e.g. "tavily" or "arxiv"
+            locator: URL or arXiv id
+            topic: Query the source was found for
+            summary: What the source says
+            title: Optional title
+
+        Returns:
+            The stored record (new or existing), or None if the summary is empty
+        """
+        summary = _normalize(summary or "")
+        if not summary:
+            return None
+        if self.max_summary_chars and len(summary) > self.max_summary_chars:
+            summary = summary[:self.max_summary_chars].rsplit(" ", 1)[0] + " ..."
+        digest = content_hash(summary)
+        key = locator.strip().rstrip("/").lower()
+
+        with self._lock:
+            self.additions += 1
+            existing = self._by_locator.get(key)
+            if existing is not None:
+                # Keep the fuller summary, e.g. a section read after a search snippet
+                if len(summary) > len(existing.summary) and digest not in self._by_hash:
+                    self._by_hash.pop(existing.hash, None)
+                    existing.summary, existing.hash = summary, digest
+                    self._by_hash[digest] = existing
+                return existing
+            duplicate = self._by_hash.get(digest)
+            if duplicate is not None:
+                logger.debug(f"Skipping {locator}: same content as [{duplicate.id}] {duplicate.locator}")
+                return duplicate
+
+            record = EvidenceRecord(
+                id=f"S{len(self.records) + 1}",
+                source=source,
+                locator=locator.strip(),
+                topic=topic,
+                summary=summary,
+                hash=digest,
+                title=_normalize(title or ""),
+            )
+            self.records.append(record)
+            self._by_locator[key] = record
+            self._by_hash[digest] = record
+            return record
+
+    def to_prompt(self) -> str:
+        """One compact line per source, in citation id order."""
+        return "\n".join(record.to_prompt_line() for record in self.records)
+
+
+class EvidenceRegistry:
+    """
+    Evidence stores of the open research runs.
+
+    Tools find the store of the run they work for through their conversation
+    id, which is the run id or starts with "<run_id>:" (see TokenLedger).
+    """
+
+    def __init__(self):
+        self.stores: Dict[str, EvidenceStore] = {}
+        self._lock = threading.Lock()
+
+    def open_run(self, run_id: str, max_summary_chars: int = 1200) -> EvidenceStore:
+        store = EvidenceStore(max_summary_chars)
+        with self._lock:
+            self.stores[run_id] = store
+        return store
+
+    def close_run(self, run_id: str) -> Optional[EvidenceStore]:
+        with self._lock:
+            return self.stores.pop(run_id, None)
+
+    def for_conversation(self, conversation_id: Optional[str]) -> Optional[EvidenceStore]:
+        if not conversation_id:
+            return None
+        with self._lock:
+            return self.stores.get(conversation_id.split(":", 1)[0])
+
+
+evidence_registry = EvidenceRegistry()
+
+
+class EvidenceRecorder:
+    """
+    Records the sources a tool returns into the evidence store of the run it works for.
+
+    LLMBehaviour calls set_conversation_id on its tools before each
+    processing round; attach() gives a tool that hook.
+    """
+
+    def __init__(self, source: str, registry: Optional[EvidenceRegistry] = None):
+        self.source = source
+        self.registry = registry or evidence_registry
+        self.conversation_id: Optional[str] = None
+
+    def attach(self, tool):
+        tool.set_conversation_id = self.set_conversation_id
+        return tool
+
+    def set_conversation_id(self, conversation_id: str):
+        self.conversation_id = conversation_id
+
+    def record(self, locator: str, topic: str, summary: str, title: str = "") -> Optional[EvidenceRecord]:
+        store = self.registry.for_conversation(self.conversation_id)
+        if store is None:
+            return None
+        return store.add(self.source, locator, topic, summary, title)
+
+
+def cite(record: Optional[EvidenceRecord]) -> str:
+    """Citation marker for a tool result line, empty outside a research run."""
+    return f" [{record.id}]" if record is not None else ""
@@ -0,0 +1,168 @@
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+_MAX_TRUNCATION_CUTS = 5
+
+
+def _scan(text: str, start: int) -> Tuple[str, List[str], List[int], bool, bool]:
+    """
+    Copy the JSON value starting at text[start] while fixing it up.
+
+    Trailing commas are dropped and Python literals (True/False/None) are
+    translated, both only outside strings.
+
+    Returns:
+        (cleaned text, brackets still open, where the last element of each open bracket starts in the cleaned text,
+        whether the text ended inside a string, whether the value was closed)
+    """
+    # One entry per character, so positions in out are positions in the cleaned text
+    out: List[str] = []
+    stack: List[str] = []
+    element_starts: List[int] = []
+    in_string = False
+    escaped = False
+    i = start
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                # Raw newlines are not allowed inside JSON strings
+                out[-1:] = "\\n"
+            i += 1
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+            element_starts.append(len(out) + 1)
+        elif char == "," and element_starts:
+            element_starts[-1] = len(out) + 1
+        elif char in "}]":
+            # Drop a trailing comma before the closing bracket
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+                element_starts.pop()
+            out.append(char)
+            if not stack:
+                return "".join(out), stack, element_starts, False, True
+            i += 1
+            continue
+        elif char.isalpha():
+            word = re.match(r"[A-Za-z]+", text[i:]).group(0)
+            out.extend(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out), stack, element_starts, in_string, False
+
+
+def _close_truncated(body: str, stack: List[str], element_starts: List[int], in_string: bool) -> str:
+    """Close a value that was cut off, dropping a dangling key or separator and a half-written array element."""
+    if stack and stack[-1] == "[":
+        last_element = body[element_starts[-1]:].strip()
+        # A cut string or scalar may be missing characters; a closed string or container is complete
+        if last_element and (in_string or last_element[-1] not in '"}]'):
+            body = body[:element_starts[-1]]
+            in_string = False
+    if in_string:
+        body += '"'
+    body = body.rstrip()
+    if body.endswith(":"):
+        # Drop the key that lost its value
+        key_start = body.rfind('"', 0, body.rfind('"', 0, len(body) - 1))
+        body = body[:key_start].rstrip() if key_start >= 0 else body[:-1]
+    body = body.rstrip().rstrip(",")
+    return body + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def parse_json_object(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse the first JSON object in an LLM response, repairing common defects.
+
+    Handles markdown fences, prose around the object, trailing commas,
+    Python literals, raw newlines in strings and truncated output. If the
+    object cannot be recovered from the first "{", every later "{" is tried.
+
+    Args:
+        text: Raw LLM response
+
+    Returns:
+        The parsed object, or None if no object could be recovered
+
+    Examples:
+        The last element of a truncated array may be cut, so it is dropped:
+
+        >>> parse_json_object('{"queries": ["solar cells", "perovskite stab')
+        {'queries': ['solar cells']}
+        >>> parse_json_object('{"scores": [0.9, 0.75, 0.1')
+        {'scores': [0.9, 0.75]}
+        >>> parse_json_object('{"steps": [{"id": 1}, {"id": 2}')
+        {'steps': [{'id': 1}, {'id': 2}]}
+
+        Braces in the prose before the object are skipped:
+
+        >>> parse_json_object('Use {braces} for sets. Plan: {"steps": [], "done": True}')
+        {'steps': [], 'done': True}
+    """
+    if not text:
+        return None
+    try:
+        value = json.loads(text)
+        return value if isinstance(value, dict) else None
+    except json.JSONDecodeError:
+        pass
+
+    fenced = _FENCE_RE.search(text)
+    candidates = [fenced.group(1), text] if fenced else [text]
+    for candidate in candidates:
+        start = candidate.find("{")
+        while start >= 0:
+            value = _repair_from(candidate[start:])
+            if value is not None:
+                return value
+            start = candidate.find("{", start + 1)
+    return None
+
+
+def _repair_from(remaining: str) -> Optional[Dict[str, Any]]:
+    """Repair and parse the object starting at the beginning of remaining."""
+    for _ in range(_MAX_TRUNCATION_CUTS):
+        body, stack, element_starts, in_string, closed = _scan(remaining, 0)
+        if not closed:
+            body = _close_truncated(body, stack, element_starts, in_string)
+        try:
+            value = json.loads(body)
+        except json.JSONDecodeError as e:
+            logger.debug(f"Could not repair JSON: {e}")
+            # A truncated value may end in a half-written element: drop it and retry
+            cut = remaining.rfind(",")
+            if closed or cut <= 0:
+                return None
+            remaining = remaining[:cut]
+            continue
+        if isinstance(value, dict):
+            if not closed:
+                logger.info("Recovered a truncated JSON object")
+            return value
+        return None
+    return None
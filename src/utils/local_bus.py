@@ -0,0 +1,122 @@
+import logging
+from importlib.metadata import version
+from typing import Dict, Optional
+from slixmpp import JID
+from spade.agent import Agent
+from spade.container import Container
+from spade.message import Message
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_MODES = ("xmpp", "local")
+
+
+# SPADE release whose Agent startup and shutdown sequences start() and stop() are written against
+SPADE_VERSION = "4.1"
+
+
+def _check_spade_version():
+    installed = version("spade")
+    if installed != SPADE_VERSION and not installed.startswith(f"{SPADE_VERSION}."):
+        raise RuntimeError(
+            f"LocalMessageBus supports SPADE {SPADE_VERSION}.x, found {installed}; "
+            "check start() and stop() against the new Agent._async_start and _async_stop"
+        )
+
+
+async def _skip_connect():
+    """Stands in for Agent._async_connect while the bus starts an agent."""
+
+
+class LocalMessageBus:
+    """
+    Offline transport: runs the agents of one process without an XMPP server.
+
+    Co-located agents already bypass XMPP in SPADE: every agent registers in
+    the process-wide Container, whose send() hands a message straight to the
+    recipient's dispatch() when the recipient is registered and only falls
+    back to the XMPP client otherwise. What SPADE lacks is a way to run an
+    agent without connecting, which is what this bus adds. Attached agents
+    send through the bus, which delegates to the Container and drops
+    messages for agents outside the process, and are started and stopped by
+    the bus instead of Agent.start()/stop(), without an XMPP session.
+    """
+
+    def __init__(self):
+        _check_spade_version()
+        self.container = Container()
+        self._agents: Dict[str, Agent] = {}
+        self.messages_delivered = 0
+        self.bytes_delivered = 0
+
+    def attach(self, agent: Agent):
+        """
+        Route an agent's messages through the bus. Must be called before the agent starts.
+
+        Args:
+            agent: Agent to attach
+        """
+        self._agents[str(agent.jid.bare)] = agent
+        agent.set_container(self)
+
+    def detach(self, agent: Agent):
+        """Give an agent back to the SPADE container."""
+        self._agents.pop(str(agent.jid.bare), None)
+        agent.set_container(self.container)
+
+    def has_agent(self, jid: str) -> bool:
+        return str(JID(jid).bare) in self._agents
+
+    async def send(self, msg: Message, behaviour) -> None:
+        """Deliver a message to a co-located agent through the SPADE container; there is no XMPP fallback."""
+        if not self.container.has_agent(str(msg.to)):
+            logger.error(f"Dropping message from {behaviour.agent.jid} to {msg.to}: recipient is not in this process")
+            return
+        self.messages_delivered += 1
+        self.bytes_delivered += len(msg.body or "")
+        await self.container.send(msg, behaviour)
+
+    async def start(self, agent: Agent):
+        """
+        Start an attached agent with SPADE's own startup sequence (plugin
+        hooks, client and presence objects, setup, behaviours), skipping
+        only its connect step: the client is created but never connects and
+        no presence is sent.
+        """
+        agent._async_connect = _skip_connect
+        try:
+            await agent.start(auto_register=False)
+        finally:
+            # Back to Agent._async_connect
+            del agent._async_connect
+        logger.info(f"Agent {agent.jid} running without XMPP")
+
+    async def stop(self, agent: Agent):
+        """
+        Stop an agent started by the bus. Mirrors Agent._async_stop of the
+        pinned SPADE version without the presence update and disconnect, as
+        there is no session to close.
+        """
+        for behaviour in agent.behaviours:
+            behaviour.kill()
+        if agent.web.is_started():
+            await agent.web.runner.cleanup()
+        agent._alive.clear()
+
+
+def create_message_bus(mode: str) -> Optional[LocalMessageBus]:
+    """
+    Create the bus for a transport mode.
+
+    Args:
+        mode: "xmpp" (no bus; co-located agents still talk in memory through
+            the SPADE container) or "local" (no XMPP server at all)
+
+    Returns:
+        A LocalMessageBus, or None when agents connect to XMPP
+    """
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"Unknown transport mode '{mode}'. Expected one of {TRANSPORT_MODES}.")
+    if mode == "xmpp":
+        return None
+    return LocalMessageBus()
@@ -0,0 +1,118 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import itertools
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Union
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class PayloadLimitFilter(logging.Filter):
+    """
+    Bounds the size and volume of log records before they are queued.
+
+    Messages longer than max_chars are truncated, keeping the head and a
+    note of the original length. DEBUG records are sampled: only one in
+    every round(1 / debug_sample_rate) is kept.
+    """
+
+    def __init__(self, max_chars: int = 2000, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.max_chars = max_chars
+        self.debug_every = max(1, round(1 / debug_sample_rate)) if debug_sample_rate > 0 else 0
+        self._debug_count = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and self.debug_every != 1:
+            if self.debug_every == 0 or next(self._debug_count) % self.debug_every:
+                return False
+
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            record.msg = f"{message[:self.max_chars]}... [truncated, {len(message)} chars]"
+            record.args = None
+            record.truncated = True
+        return True
+
+
+class LoopSafeQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats the record before queueing it, which runs the
+    formatter on the caller's thread (the event loop). Here only the message
+    is rendered; JSON encoding and disk I/O happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(
+    log_file: str,
+    level: Union[int, str] = logging.WARNING,
+    logger_levels: Optional[Dict[str, Union[int, str]]] = None,
+    max_chars: int = 2000,
+    debug_sample_rate: float = 1.0,
+) -> QueueListener:
+    """
+    Route all logging through a queue to a JSON-lines file written by a background thread.
+
+    Args:
+        log_file: Path of the JSON-lines log file
+        level: Root logger level
+        logger_levels: Levels for specific loggers, e.g. {"spade_llm.providers": "DEBUG"}
+        max_chars: Maximum message length; longer messages are truncated (0 = no limit)
+        debug_sample_rate: Fraction of DEBUG records to keep
+
+    Returns:
+        The running QueueListener. It is stopped (and the queue flushed) at interpreter exit.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+
+    file_handler = logging.FileHandler(log_file, mode="w", encoding="utf-8")
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LoopSafeQueueHandler(log_queue)
+    queue_handler.addFilter(PayloadLimitFilter(max_chars=max_chars, debug_sample_rate=debug_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    for name, logger_level in (logger_levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
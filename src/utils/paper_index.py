@@ -0,0 +1,278 @@
+import os
+import re
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAPER_EXTENSIONS = (".md", ".txt")
+
+_HEADING_RE = re.compile(rb"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    paper_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    paper_id TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_paper ON sections (paper_id, ordinal);
+CREATE VIRTUAL TABLE IF NOT EXISTS section_text USING fts5(
+    title, body, tokenize = 'porter unicode61'
+);
+"""
+
+
+def split_sections(data: bytes) -> List[Tuple[str, int, int]]:
+    """
+    Split a markdown paper into sections on its headings.
+
+    Args:
+        data: Raw bytes of the paper file
+
+    Returns:
+        List of (title, start, end) tuples with byte offsets into data.
+        Text before the first heading is returned as a "Front matter" section.
+    """
+    headings = list(_HEADING_RE.finditer(data))
+    sections = []
+
+    if not headings or headings[0].start() > 0:
+        end = headings[0].start() if headings else len(data)
+        if data[:end].strip():
+            sections.append(("Front matter", 0, end))
+
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(data)
+        title = match.group(2).decode("utf-8", errors="replace").strip()
+        sections.append((title, match.start(), end))
+
+    return sections
+
+
+def _fts_query(query: str) -> str:
+    """Turn free text into an FTS5 OR-query of quoted terms."""
+    terms = re.findall(r"\w+", query.lower())
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class PaperIndex:
+    """
+    Incremental section-level full-text index over papers stored by the ArXiv MCP server.
+
+    Papers are re-indexed only when their size or modification time changes.
+    refresh() stats every stored file, so it is meant for startup; a paper
+    that was just downloaded or is about to be read is brought up to date
+    with refresh_paper().
+    """
+
+    def __init__(self, storage_path: str, index_path: str):
+        self.storage_path = storage_path
+        self.index_path = index_path
+        self._lock = threading.Lock()
+
+        index_dir = os.path.dirname(os.path.abspath(index_path))
+        os.makedirs(index_dir, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per call, closed by the caller: tools run in worker threads
+        return sqlite3.connect(self.index_path)
+
+    def _scan_storage(self) -> Dict[str, Tuple[str, float, int]]:
+        found = {}
+        if not os.path.isdir(self.storage_path):
+            return found
+        for entry in os.scandir(self.storage_path):
+            if entry.is_file() and entry.name.endswith(PAPER_EXTENSIONS):
+                paper_id, ext = os.path.splitext(entry.name)
+                if self._storage_file(paper_id, ext) is None:
+                    continue
+                stat = entry.stat()
+                found[paper_id] = (entry.path, stat.st_mtime, stat.st_size)
+        return found
+
+    def refresh(self) -> int:
+        """
+        Bring the index up to date with the storage directory.
+
+        Returns:
+            Number of papers (re)indexed
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            on_disk = self._scan_storage()
+            indexed = {
+                row[0]: (row[1], row[2])
+                for row in conn.execute("SELECT paper_id, mtime, size FROM papers")
+            }
+
+            for paper_id in indexed.keys() - on_disk.keys():
+                self._remove_paper(conn, paper_id)
+
+            updated = 0
+            for paper_id, (path, mtime, size) in on_disk.items():
+                if indexed.get(paper_id) == (mtime, size):
+                    continue
+                if self._index_file(conn, paper_id, path, mtime, size):
+                    updated += 1
+
+            if updated:
+                logger.info(f"Indexed {updated} papers from {self.storage_path}")
+            return updated
+
+    def refresh_paper(self, paper_id: str) -> bool:
+        """
+        Bring one paper's entry up to date without scanning the storage directory.
+
+        The file is only read if its size or modification time changed.
+
+        Returns:
+            True if the paper was (re)indexed or removed
+        """
+        candidates = [path for path in (self._storage_file(paper_id, ext) for ext in PAPER_EXTENSIONS) if path]
+        if not candidates:
+            logger.warning(f"Rejected paper id {paper_id!r}: not a file name in {self.storage_path}")
+            return False
+        with self._lock, closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT path, mtime, size FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+            if row is not None:
+                candidates.insert(0, row[0])
+            for path in candidates:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if row is not None and (path, stat.st_mtime, stat.st_size) == tuple(row):
+                    return False
+                return self._index_file(conn, paper_id, path, stat.st_mtime, stat.st_size)
+            if row is None:
+                return False
+            self._remove_paper(conn, paper_id)
+            return True
+
+    def _storage_file(self, paper_id: str, ext: str) -> Optional[str]:
+        """
+        Path of a paper file in the storage directory, or None if the id would
+        lead outside it. Paper ids come from the LLM, so "../x" and the like
+        must not reach the file system.
+        """
+        if not paper_id or paper_id in (".", "..") or "/" in paper_id or os.sep in paper_id or (os.altsep and os.altsep in paper_id):
+            return None
+        storage = os.path.realpath(self.storage_path)
+        path = os.path.join(self.storage_path, f"{paper_id}{ext}")
+        # Symlinks in the storage directory must not lead out of it either
+        if os.path.commonpath([storage, os.path.realpath(path)]) != storage:
+            return None
+        return path
+
+    def _index_file(self, conn: sqlite3.Connection, paper_id: str, path: str, mtime: float, size: int) -> bool:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.error(f"Could not read paper {path}: {e}")
+            return False
+        self._remove_paper(conn, paper_id)
+        self._add_paper(conn, paper_id, path, mtime, size, data)
+        return True
+
+    def _remove_paper(self, conn: sqlite3.Connection, paper_id: str):
+        conn.execute(
+            "DELETE FROM section_text WHERE rowid IN (SELECT id FROM sections WHERE paper_id = ?)",
+            (paper_id,),
+        )
+        conn.execute("DELETE FROM sections WHERE paper_id = ?", (paper_id,))
+        conn.execute("DELETE FROM papers WHERE paper_id = ?", (paper_id,))
+
+    def _add_paper(self, conn: sqlite3.Connection, paper_id: str, path: str, mtime: float, size: int, data: bytes):
+        conn.execute(
+            "INSERT INTO papers (paper_id, path, mtime, size) VALUES (?, ?, ?, ?)",
+            (paper_id, path, mtime, size),
+        )
+        for ordinal, (title, start, end) in enumerate(split_sections(data)):
+            cursor = conn.execute(
+                "INSERT INTO sections (paper_id, ordinal, title, start, end) VALUES (?, ?, ?, ?, ?)",
+                (paper_id, ordinal, title, start, end),
+            )
+            body = data[start:end].decode("utf-8", errors="replace")
+            conn.execute(
+                "INSERT INTO section_text (rowid, title, body) VALUES (?, ?, ?)",
+                (cursor.lastrowid, title, body),
+            )
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search indexed sections by relevance.
+
+        Args:
+            query: Free-text search query
+            limit: Maximum number of sections to return
+
+        Returns:
+            List of dicts with paper_id, section, ordinal and snippet, best match first
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT s.paper_id, s.title, s.ordinal,
+                       snippet(section_text, 1, '**', '**', ' ... ', 48)
+                FROM section_text
+                JOIN sections s ON s.id = section_text.rowid
+                WHERE section_text MATCH ?
+                ORDER BY bm25(section_text, 5.0, 1.0)
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+
+        return [
+            {"paper_id": paper_id, "section": title, "ordinal": ordinal, "snippet": snippet}
+            for paper_id, title, ordinal, snippet in rows
+        ]
+
+    def get_paper(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored path and section offset table of an indexed paper.
+
+        Args:
+            paper_id: Paper identifier (file name without extension)
+
+        Returns:
+            Dict with path, size and a list of sections (ordinal, title, start, end),
+            or None if the paper is not indexed
+        """
+        with closing(self._connect()) as conn:
+            paper = conn.execute(
+                "SELECT path, size FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+            if paper is None:
+                return None
+            sections = conn.execute(
+                "SELECT ordinal, title, start, end FROM sections WHERE paper_id = ? ORDER BY ordinal",
+                (paper_id,),
+            ).fetchall()
+
+        return {
+            "path": paper[0],
+            "size": paper[1],
+            "sections": [
+                {"ordinal": ordinal, "title": title, "start": start, "end": end}
+                for ordinal, title, start, end in sections
+            ],
+        }
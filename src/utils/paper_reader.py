@@ -0,0 +1,106 @@
+import mmap
+import logging
+from typing import Optional, Dict, Any, Union
+from src.utils.paper_index import PaperIndex
+
+logger = logging.getLogger(__name__)
+
+
+class PaperReader:
+    """
+    Reads sections or byte ranges of stored papers through a memory map.
+
+    Section boundaries come from the offset table kept by PaperIndex, so only
+    the requested slice of the file is ever paged in and copied.
+    """
+
+    def __init__(self, index: PaperIndex, max_bytes: int = 20000):
+        self.index = index
+        self.max_bytes = max_bytes
+
+    def table_of_contents(self, paper_id: str) -> Optional[str]:
+        """
+        Describe the sections of a paper without reading its text.
+
+        Args:
+            paper_id: Paper identifier
+
+        Returns:
+            One line per section with its ordinal, title and size, or None if unknown
+        """
+        paper = self._get_paper(paper_id)
+        if paper is None:
+            return None
+        lines = [
+            f"{s['ordinal']}. {s['title']} ({s['end'] - s['start']} bytes)"
+            for s in paper["sections"]
+        ]
+        return "\n".join(lines)
+
+    def read_section(self, paper_id: str, section: Union[int, str]) -> Optional[Dict[str, Any]]:
+        """
+        Read one section of a paper.
+
+        Args:
+            paper_id: Paper identifier
+            section: Section ordinal, or a (case-insensitive) part of its title
+
+        Returns:
+            Dict with title, text and truncated flag, or None if the paper or section is unknown
+        """
+        paper = self._get_paper(paper_id)
+        if paper is None:
+            return None
+
+        match = None
+        for s in paper["sections"]:
+            if isinstance(section, int) or str(section).isdigit():
+                if s["ordinal"] == int(section):
+                    match = s
+                    break
+            elif str(section).lower() in s["title"].lower():
+                match = s
+                break
+
+        if match is None:
+            return None
+
+        text, truncated = self._read(paper["path"], match["start"], match["end"] - match["start"])
+        return {"title": match["title"], "text": text, "truncated": truncated}
+
+    def read_range(self, paper_id: str, start: int, length: int) -> Optional[Dict[str, Any]]:
+        """
+        Read an arbitrary byte range of a paper.
+
+        Args:
+            paper_id: Paper identifier
+            start: Byte offset to start from
+            length: Number of bytes to read (capped at max_bytes)
+
+        Returns:
+            Dict with text and truncated flag, or None if the paper is unknown
+        """
+        paper = self._get_paper(paper_id)
+        if paper is None:
+            return None
+        start = max(0, min(start, paper["size"]))
+        text, truncated = self._read(paper["path"], start, max(0, length))
+        return {"text": text, "truncated": truncated}
+
+    def _get_paper(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        # Keep this paper's offset table in sync with its file before slicing it
+        self.index.refresh_paper(paper_id)
+        return self.index.get_paper(paper_id)
+
+    def _read(self, path: str, start: int, length: int):
+        with open(path, "rb") as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # Truncated only if more bytes than max_bytes were requested and exist
+                    available = max(0, min(length, len(mm) - start))
+                    chunk = mm[start:start + min(available, self.max_bytes)]
+            except ValueError:
+                # Empty files cannot be memory-mapped
+                available, chunk = 0, b""
+
+        return chunk.decode("utf-8", errors="ignore"), available > self.max_bytes
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import List
+from slixmpp import JID
+
+logger = logging.getLogger(__name__)
+
+
+def replica_jids(jid: str, count: int) -> List[str]:
+    """
+    JIDs of the replicas of an agent: the JID itself for a single replica,
+    otherwise the local part numbered from 1 (tavily1@host, tavily2@host, ...).
+    """
+    if count <= 1:
+        return [jid]
+    parsed = JID(jid)
+    return [f"{parsed.local}{i}@{parsed.domain}" for i in range(1, count + 1)]
+
+
+class ReplicaPool:
+    """
+    Interchangeable replicas of one sub-agent type, handed out one task at a time.
+
+    Idle replicas wait in a FIFO queue, so work is spread round-robin and a
+    task waits for the first replica to free up when all are busy. A pool may
+    be shared by several coordinators.
+    """
+
+    def __init__(self, name: str, replicas: List[str]):
+        """
+        Args:
+            name: Name the coordinator's LLM uses for this agent type (e.g. tavily@localhost)
+            replicas: JIDs of the replicas
+        """
+        if not replicas:
+            raise ValueError(f"Pool {name} needs at least one replica")
+        self.name = name
+        self.replicas = list(replicas)
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for replica in self.replicas:
+            self._idle.put_nowait(replica)
+        self.waiting = 0
+
+    @property
+    def busy(self) -> int:
+        return len(self.replicas) - self._idle.qsize()
+
+    async def acquire(self) -> str:
+        """Wait for an idle replica and take it."""
+        self.waiting += 1
+        try:
+            return await self._idle.get()
+        finally:
+            self.waiting -= 1
+
+    def release(self, replica: str):
+        self._idle.put_nowait(replica)
+
+    def status(self) -> str:
+        return f"{self.busy}/{len(self.replicas)} replicas busy, {self.waiting} tasks queued"
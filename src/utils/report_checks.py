@@ -0,0 +1,128 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+from src.utils.rerank import tokenize
+from src.utils.evidence import EvidenceStore
+
+logger = logging.getLogger(__name__)
+
+PASS = "pass"
+FAIL = "fail"
+BORDERLINE = "borderline"
+
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+_BRACKET_RE = re.compile(r"\[([^\[\]]{1,80})\]")
+_CITATION_ID_RE = re.compile(r"\bS(\d+)\b")
+# Share of a topic's query terms the report must contain for the topic to count as covered
+_TOPIC_TERM_SHARE = 0.6
+
+
+@dataclass
+class ReportCheck:
+    verdict: str
+    topic_coverage: float
+    missing_topics: List[str] = field(default_factory=list)
+    cited_sources: int = 0
+    total_sources: int = 0
+    unknown_citations: List[str] = field(default_factory=list)
+    missing_sections: List[str] = field(default_factory=list)
+    words: int = 0
+    problems: List[str] = field(default_factory=list)
+
+    @property
+    def citation_ratio(self) -> float:
+        return self.cited_sources / self.total_sources if self.total_sources else 1.0
+
+
+def _topic_covered(topic: Dict[str, Any], report_terms: set) -> bool:
+    terms = set(tokenize(str(topic.get("query", ""))))
+    if not terms:
+        return True
+    return len(terms & report_terms) / len(terms) >= _TOPIC_TERM_SHARE
+
+
+def cited_ids(report: str) -> set:
+    """Source ids cited in the report, e.g. {"S1", "S3"} for "[S1] ... [S3, S1]"."""
+    ids = set()
+    for bracket in _BRACKET_RE.findall(report):
+        ids.update(f"S{number}" for number in _CITATION_ID_RE.findall(bracket))
+    return ids
+
+
+def check_report(
+    report: Optional[str],
+    topics: Iterable[Dict[str, Any]],
+    evidence: Optional[EvidenceStore] = None,
+    required_sections: Iterable[str] = ("summary", "references"),
+    min_words: int = 300,
+    pass_coverage: float = 1.0,
+    fail_coverage: float = 0.5,
+    pass_citation_ratio: float = 0.5,
+) -> ReportCheck:
+    """
+    Rule-based review of a draft report, run before the critic.
+
+    Measures the share of plan topics the report mentions, the sources it
+    cites (against those gathered in the evidence store), the required
+    section headings and its length. Reports that meet every pass threshold
+    pass; reports with an obvious gap (coverage below fail_coverage, less
+    than half min_words, or no citation although sources exist) fail;
+    anything in between is borderline and goes to the critic.
+
+    Args:
+        report: Draft report (markdown)
+        topics: Research topics the report should cover ({"query": ...})
+        evidence: Sources gathered for the run
+        required_sections: Words that must appear in some heading. "references" is only required when sources exist.
+        min_words: Minimum report length, in words
+        pass_coverage: Topic coverage needed to pass
+        fail_coverage: Topic coverage below which the report fails
+        pass_citation_ratio: Share of gathered sources that must be cited to pass
+
+    Returns:
+        The check result
+    """
+    report = report or ""
+    topics = list(topics)
+    report_terms = set(tokenize(report))
+    missing_topics = [str(topic.get("query", "")) for topic in topics if not _topic_covered(topic, report_terms)]
+    coverage = 1 - len(missing_topics) / len(topics) if topics else 1.0
+
+    source_ids = {record.id for record in evidence.records} if evidence else set()
+    cited = cited_ids(report)
+    unknown = sorted(cited - source_ids) if source_ids else []
+
+    headings = [heading.lower() for heading in _HEADING_RE.findall(report)]
+    missing_sections = [
+        section for section in required_sections
+        if (section != "references" or source_ids) and not any(section in heading for heading in headings)
+    ]
+    words = len(report.split())
+
+    check = ReportCheck(
+        verdict=BORDERLINE,
+        topic_coverage=round(coverage, 3),
+        missing_topics=missing_topics,
+        cited_sources=len(cited & source_ids),
+        total_sources=len(source_ids),
+        unknown_citations=unknown,
+        missing_sections=missing_sections,
+        words=words,
+    )
+    if missing_topics:
+        check.problems.append(f"Topics not covered: {'; '.join(missing_topics)}.")
+    if missing_sections:
+        check.problems.append(f"Missing sections: {', '.join(missing_sections)}.")
+    if unknown:
+        check.problems.append(f"Citations of unknown sources: {', '.join(unknown)}.")
+    if source_ids and check.citation_ratio < pass_citation_ratio:
+        check.problems.append(f"Only {check.cited_sources} of {len(source_ids)} sources are cited.")
+    if words < min_words:
+        check.problems.append(f"The report has {words} words; at least {min_words} are expected.")
+
+    if coverage < fail_coverage or words < min_words / 2 or (source_ids and not check.cited_sources):
+        check.verdict = FAIL
+    elif coverage >= pass_coverage and not check.problems:
+        check.verdict = PASS
+    return check
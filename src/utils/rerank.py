@@ -0,0 +1,96 @@
+import re
+import math
+import logging
+from collections import Counter
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was were what when "
+    "which who why with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords and single characters."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+def bm25_scores(query: str, documents: List[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """
+    Okapi BM25 score of every document for the query.
+
+    Document frequencies come from the documents themselves, so scores are
+    only comparable within one call.
+
+    Args:
+        query: Query text
+        documents: Texts to score
+        k1: Term frequency saturation
+        b: Length normalization
+
+    Returns:
+        One score per document, in order
+    """
+    query_terms = set(tokenize(query))
+    doc_terms = [Counter(tokenize(document)) for document in documents]
+    if not query_terms or not doc_terms:
+        return [0.0] * len(documents)
+
+    lengths = [sum(terms.values()) for terms in doc_terms]
+    avg_length = (sum(lengths) / len(lengths)) or 1.0
+    n_docs = len(doc_terms)
+    idf = {}
+    for term in query_terms:
+        df = sum(1 for terms in doc_terms if term in terms)
+        idf[term] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    scores = []
+    for terms, length in zip(doc_terms, lengths):
+        score = 0.0
+        for term in query_terms:
+            tf = terms.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+def rerank_results(query: str, results: List[Dict[str, Any]], top_k: int = 3, min_score: float = 0.3) -> List[Dict[str, Any]]:
+    """
+    Rerank search results by BM25 relevance of their text to the query and drop weak ones.
+
+    Each result is scored on its title and raw_content (or content). Results
+    scoring below min_score times the best score are dropped. If no result
+    shares a term with the query, relevance cannot be judged and the original
+    order is kept.
+
+    Args:
+        query: Query the results were retrieved for
+        results: Search results; a "rerank_score" field is added to each
+        top_k: Maximum results to keep (0 = no limit)
+        min_score: Cutoff relative to the best score, between 0 and 1
+
+    Returns:
+        The kept results, best first
+    """
+    if not results:
+        return results
+    documents = [f"{result.get('title', '')} {result.get('raw_content') or result.get('content', '')}" for result in results]
+    scores = bm25_scores(query, documents)
+    for result, score in zip(results, scores):
+        result["rerank_score"] = round(score, 4)
+
+    best = max(scores)
+    if best <= 0:
+        logger.info(f"No result matches the query terms of '{query}', keeping the search order")
+        return results[:top_k] if top_k else results
+
+    ranked = sorted(results, key=lambda result: result["rerank_score"], reverse=True)
+    kept = [result for result in ranked if result["rerank_score"] >= min_score * best]
+    if top_k:
+        kept = kept[:top_k]
+    logger.info(f"Reranking kept {len(kept)} of {len(results)} results for '{query}'")
+    return kept
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+import aiohttp
+from spade.agent import Agent
+from spade_llm.mcp import MCPToolAdapter
+from src.utils.local_bus import LocalMessageBus
+
+logger = logging.getLogger(__name__)
+
+
+def _readiness_problems(agent: Agent, bus: Optional[LocalMessageBus] = None) -> List[str]:
+    """List what keeps a started agent from taking requests."""
+    problems = []
+    if not agent.is_alive():
+        problems.append("not running")
+    if bus is not None:
+        if not bus.has_agent(str(agent.jid)):
+            problems.append("not attached to the message bus")
+    elif agent.client is None or not agent.client.is_connected():
+        problems.append("not connected to XMPP")
+
+    # spade_llm logs and swallows MCP discovery errors, so check every server produced tools
+    discovered = {tool.server_config.name for tool in getattr(agent, "tools", []) if isinstance(tool, MCPToolAdapter)}
+    for server in getattr(agent, "mcp_servers", None) or []:
+        if server.name not in discovered:
+            problems.append(f"no tools discovered on MCP server {server.name}")
+
+    return problems
+
+
+async def preload_ollama_model(base_url: str, model: str, keep_alive: str = "30m") -> bool:
+    """
+    Ask Ollama to load a model into memory before the first real request.
+
+    Args:
+        base_url: Ollama server URL
+        model: Model name to load
+        keep_alive: How long Ollama should keep the model loaded
+
+    Returns:
+        True if the model was loaded, False otherwise
+    """
+    if not base_url:
+        return False
+
+    url = f"{base_url.rstrip('/')}/api/generate"
+    try:
+        async with aiohttp.ClientSession() as session:
+            # A generate request without a prompt only loads the model
+            async with session.post(url, json={"model": model, "keep_alive": keep_alive}) as response:
+                response.raise_for_status()
+        logger.info(f"Preloaded Ollama model {model}")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not preload Ollama model {model}: {e}")
+        return False
+
+
+class AgentLauncher:
+    """
+    Starts and stops a group of agents concurrently.
+
+    Agent.start() returns once the agent is connected and its setup (including
+    MCP tool discovery) has run, so readiness is checked once right after it:
+    the agent is running, connected to XMPP or attached to the bus, and every
+    configured MCP server produced tools. Agents failing a check are reported
+    at once instead of waiting out the timeout, which only bounds start().
+    If a LocalMessageBus is given, agents are attached to it and started
+    by it, without XMPP.
+    """
+
+    def __init__(self, timeout: float = 30.0, bus: Optional[LocalMessageBus] = None):
+        self.timeout = timeout
+        self.bus = bus
+        self.agents: List[Agent] = []
+
+    async def start(self, *agents: Agent) -> List[Agent]:
+        """
+        Start agents concurrently and check that they are ready.
+
+        Args:
+            *agents: Agents to start
+
+        Returns:
+            Agents that failed to start or are not ready
+        """
+        started_at = time.monotonic()
+        self.agents.extend(agents)
+        if self.bus is not None:
+            for agent in agents:
+                self.bus.attach(agent)
+
+        results = await asyncio.gather(*(self._start(agent) for agent in agents), return_exceptions=True)
+        not_ready = []
+        for agent, result in zip(agents, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.error(f"Agent {agent.jid} did not start within {self.timeout:.0f}s")
+                not_ready.append(agent)
+            elif isinstance(result, Exception):
+                logger.error(f"Agent {agent.jid} failed to start: {result}")
+                not_ready.append(agent)
+            else:
+                problems = _readiness_problems(agent, self.bus)
+                if problems:
+                    logger.error(f"Agent {agent.jid} not ready: {', '.join(problems)}")
+                    not_ready.append(agent)
+
+        elapsed = time.monotonic() - started_at
+        logger.info(f"{len(agents) - len(not_ready)}/{len(agents)} agents ready in {elapsed:.2f}s")
+        return not_ready
+
+    async def _start(self, agent: Agent):
+        start = self.bus.start(agent) if self.bus is not None else agent.start()
+        await asyncio.wait_for(start, timeout=self.timeout)
+
+    async def stop(self, agents: Optional[List[Agent]] = None):
+        """
+        Stop agents concurrently.
+
+        Args:
+            agents: Agents to stop. Defaults to every agent started by this launcher.
+        """
+        agents = agents if agents is not None else list(reversed(self.agents))
+        stop = self.bus.stop if self.bus is not None else (lambda agent: agent.stop())
+        results = await asyncio.gather(*(stop(agent) for agent in agents), return_exceptions=True)
+        for agent, result in zip(agents, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error stopping agent {agent.jid}: {result}")
+            if self.bus is not None:
+                self.bus.detach(agent)
+            if agent in self.agents:
+                self.agents.remove(agent)
@@ -0,0 +1,58 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Rough average for English text with BPE tokenizers; good enough for accounting
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Estimate the number of tokens in a piece of text without a tokenizer.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """
+    Estimate the number of tokens in a chat prompt.
+
+    Args:
+        messages: Prompt messages as sent to the provider
+
+    Returns:
+        Estimated token count, including a small per-message overhead
+    """
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str):
+            content = json.dumps(content) if content else ""
+        total += estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        if message.get("tool_calls"):
+            total += estimate_tokens(json.dumps(message["tool_calls"]))
+    return total
+
+
+def estimate_response_tokens(response: Dict[str, Any]) -> int:
+    """
+    Estimate the number of completion tokens in a provider response.
+
+    Args:
+        response: Dict returned by get_llm_response
+
+    Returns:
+        Estimated token count of the text and tool calls
+    """
+    tokens = estimate_tokens(response.get("text"))
+    if response.get("tool_calls"):
+        tokens += estimate_tokens(json.dumps(response["tool_calls"], default=str))
+    return tokens
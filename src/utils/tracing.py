@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import logging
+import itertools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterator, List, Optional
+from spade_llm.providers.base_provider import BaseLLMProvider
+from src.config.settings import settings
+from src.utils.tokens import estimate_prompt_tokens, estimate_response_tokens
+
+logger = logging.getLogger(__name__)
+
+_span_ids = itertools.count(1)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    track: str
+    span_id: int
+    parent_id: Optional[int]
+    start_us: float
+    duration_us: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default=0.0, repr=False)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class Tracer:
+    """
+    Collects timing spans for FSM states, agent requests, tool calls and LLM calls.
+
+    Spans nest through a context variable, so a span opened inside another
+    one (in the same task or a thread started with asyncio.to_thread)
+    records it as its parent.
+    """
+
+    def __init__(self, enabled: bool = True, max_spans: int = 100000):
+        self.enabled = enabled
+        self.spans: deque = deque(maxlen=max_spans)
+
+    def start_span(self, name: str, category: str = "", agent: Optional[str] = None, **attributes) -> Optional[Span]:
+        """
+        Open a span that is closed later with end_span. Prefer span() where possible.
+
+        Returns:
+            The new span, or None if tracing is disabled
+        """
+        if not self.enabled:
+            return None
+        parent = _current_span.get()
+        track = agent or (parent.track if parent else "main")
+        return Span(
+            name=name,
+            category=category,
+            track=track,
+            span_id=next(_span_ids),
+            parent_id=parent.span_id if parent else None,
+            start_us=time.time() * 1e6,
+            attributes=attributes,
+            _started=time.perf_counter(),
+        )
+
+    def activate(self, span: Optional[Span]) -> Optional[contextvars.Token]:
+        """Make a span started with start_span the parent of spans opened after it."""
+        return _current_span.set(span) if span is not None else None
+
+    def deactivate(self, token: Optional[contextvars.Token]):
+        if token is not None:
+            _current_span.reset(token)
+
+    def end_span(self, span: Optional[Span], **attributes):
+        if span is None:
+            return
+        span.duration_us = (time.perf_counter() - span._started) * 1e6
+        span.attributes.update(attributes)
+        self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, category: str = "", agent: Optional[str] = None, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Time a block of code.
+
+        Args:
+            name: Span name, e.g. the state or tool name
+            category: Span kind: "state", "request", "tool" or "llm"
+            agent: Agent the work belongs to. Inherited from the parent span if omitted.
+            **attributes: Extra data stored with the span (sizes, token counts, ...)
+        """
+        span = self.start_span(name, category, agent, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def clear(self):
+        self.spans.clear()
+
+    def _records(self) -> List[Dict[str, Any]]:
+        records = []
+        for span in list(self.spans):
+            record = asdict(span)
+            record.pop("_started")
+            records.append(record)
+        return records
+
+    def export_jsonl(self, path: str):
+        """Write one JSON object per span."""
+        with open(path, "w") as f:
+            for record in self._records():
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def export_chrome_trace(self, path: str):
+        """Write spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        tracks: Dict[str, int] = {}
+        events = []
+        for record in self._records():
+            tid = tracks.setdefault(record["track"], len(tracks) + 1)
+            events.append({
+                "name": record["name"],
+                "cat": record["category"],
+                "ph": "X",
+                "ts": record["start_us"],
+                "dur": record["duration_us"],
+                "pid": 1,
+                "tid": tid,
+                "args": record["attributes"],
+            })
+        for track, tid in tracks.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": track}})
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def export(self, prefix: str) -> Optional[str]:
+        """
+        Export collected spans as <prefix>.jsonl and <prefix>.trace.json and clear them.
+
+        Returns:
+            The prefix written to, or None if there was nothing to export
+        """
+        if not self.enabled or not self.spans:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+        self.export_jsonl(f"{prefix}.jsonl")
+        self.export_chrome_trace(f"{prefix}.trace.json")
+        logger.info(f"Exported {len(self.spans)} spans to {prefix}.*")
+        self.clear()
+        return prefix
+
+
+tracer = Tracer(enabled=settings.TRACE_ENABLED)
+
+
+class TracedProvider(BaseLLMProvider):
+    """LLM provider wrapper that records a span for every LLM call."""
+
+    def __init__(self, provider: BaseLLMProvider, agent_name: str):
+        super().__init__()
+        self.provider = provider
+        self.agent_name = agent_name
+
+    def __getattr__(self, name):
+        # Expose wrapped provider attributes such as model or base_url
+        return getattr(self.provider, name)
+
+    async def get_llm_response(self, context, tools=None, conversation_id=None, output_schema=None) -> Dict[str, Any]:
+        prompt = context.get_prompt(conversation_id)
+        with tracer.span(
+            "llm_call",
+            category="llm",
+            agent=self.agent_name,
+            model=getattr(self.provider, "model", None),
+            conversation_id=conversation_id,
+            prompt_messages=len(prompt),
+            prompt_tokens=estimate_prompt_tokens(prompt),
+        ) as span:
+            response = await self.provider.get_llm_response(context, tools, conversation_id, output_schema)
+            if span is not None:
+                span.set(
+                    completion_tokens=estimate_response_tokens(response),
+                    tool_calls=len(response.get("tool_calls") or []),
+                )
+            return response
+
+
+def trace_tool(tool, agent_name: str):
+    """
+    Record a span for every execution of an LLMTool.
+
+    The tool keeps its class (MCP adapters stay MCP adapters); only this
+    instance's execute method is wrapped.
+
+    Args:
+        tool: LLMTool to instrument
+        agent_name: Agent the tool belongs to
+
+    Returns:
+        The same tool
+    """
+    if getattr(tool, "_traced", False):
+        return tool
+    execute = tool.execute
+
+    async def traced_execute(**kwargs):
+        with tracer.span(tool.name, category="tool", agent=agent_name, args_bytes=len(json.dumps(kwargs, default=str))) as span:
+            result = await execute(**kwargs)
+            if span is not None:
+                span.set(result_bytes=len(result) if isinstance(result, str) else len(json.dumps(result, default=str)))
+            return result
+
+    tool.execute = traced_execute
+    tool._traced = True
+    return tool
+
+
+class TracedToolsMixin:
+    """LLMAgent mixin that records a span for every tool call, including MCP tools added at setup."""
+
+    def _register_tool(self, tool):
+        super()._register_tool(trace_tool(tool, self.name))
@@ -0,0 +1,664 @@
+"""
+Offline full-text index over a Wikipedia XML dump (pages-articles, uncompressed).
+
+The index is a set of immutable segments, each a group of flat files that
+are memory-mapped for searching: a sorted term lexicon, postings, a document
+table with the byte range of every article in the dump, and a title table.
+Building is incremental: each call scans the dump from where the last one
+stopped and appends segments, so a large dump can be indexed in several
+runs, or while it is still being downloaded. Article text is never copied
+into the index; sections are split and read from the dump on demand.
+
+Usage:
+    python -m src.utils.wiki_index --max-articles 100000
+"""
+import os
+import re
+import json
+import html
+import mmap
+import heapq
+import math
+import struct
+import uuid
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.config.settings import settings
+from src.utils.rerank import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Segment records
+_DOC = struct.Struct("<QQQII")  # text start, text end (dump offsets), title offset, title length, length in terms
+_LEX = struct.Struct("<QHQIf")  # term offset, term length, first posting, document frequency, max impact
+_POSTING = struct.Struct("<IH")  # document (within the segment), term frequency
+_TITLE = struct.Struct("<I")  # documents sorted by normalized title
+_SEGMENT_FILES = ("docs", "titles", "lex", "terms", "post", "tidx")
+# Bumped when the segment layout changes; indexes in another format are rebuilt
+_FORMAT = 2
+
+# Title terms count as this many occurrences
+_TITLE_BOOST = 3
+# Default BM25 parameters, also those the impacts stored in segments are computed with
+_K1 = 1.2
+_B = 0.75
+# Bytes at the start of the dump hashed to recognize it
+_SIGNATURE_BYTES = 1 << 16
+
+_TITLE_RE = re.compile(rb"<title>(.*?)</title>", re.DOTALL)
+_NS_RE = re.compile(rb"<ns>(\d+)</ns>")
+_TEXT_RE = re.compile(rb"<text\b[^>]*?(/?)>")
+_HEADING_RE = re.compile(rb"^(={2,6})[ \t]*(.+?)[ \t]*\1[ \t]*$", re.MULTILINE)
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_REF_RE = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+_TEMPLATE_RE = re.compile(r"\{\{[^{}]*\}\}")
+_TABLE_RE = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+_FILE_LINK_RE = re.compile(r"\[\[(?:File|Image|Category):(?:[^\[\]]|\[\[[^\]]*\]\])*\]\]", re.IGNORECASE)
+_LINK_RE = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]+)\]\]")
+_EXTERNAL_LINK_RE = re.compile(r"\[https?://\S+\s*([^\]]*)\]")
+_TAG_RE = re.compile(r"<[^>]+>")
+_EMPHASIS_RE = re.compile(r"'{2,}")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def clean_wikitext(text: str) -> str:
+    """Reduce wikitext to plain text: drop templates, references, tables, files and markup, keep link labels."""
+    text = _COMMENT_RE.sub("", text)
+    text = _REF_RE.sub("", text)
+    # Innermost templates first, for nested ones
+    for _ in range(5):
+        text, found = _TEMPLATE_RE.subn("", text)
+        if not found:
+            break
+    text = _TABLE_RE.sub("", text)
+    text = _FILE_LINK_RE.sub("", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _EXTERNAL_LINK_RE.sub(r"\1", text)
+    text = _TAG_RE.sub("", text)
+    text = _EMPHASIS_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.replace("_", " ").split()).casefold()
+
+
+def _decode(raw: bytes) -> str:
+    """Dump text is XML-escaped UTF-8."""
+    return html.unescape(raw.decode("utf-8", errors="replace"))
+
+
+def _map(path: str):
+    """Read-only memory map of a file; empty files map to b""."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def scan_pages(dump, offset: int) -> Iterator[Tuple[int, Optional[Tuple[str, int, int]]]]:
+    """
+    Scan the pages of a dump from a byte offset.
+
+    A page that is not complete yet (dump still being written) ends the scan.
+
+    Yields:
+        (end offset of the page, (title, text start, text end)), with None
+        instead of the tuple for pages that are not articles (other
+        namespaces, redirects, empty text)
+    """
+    while True:
+        start = dump.find(b"<page>", offset)
+        if start < 0:
+            return
+        end = dump.find(b"</page>", start)
+        if end < 0:
+            return
+        end += len(b"</page>")
+        page = dump[start:end]
+        offset = end
+
+        ns = _NS_RE.search(page)
+        title = _TITLE_RE.search(page)
+        text = _TEXT_RE.search(page)
+        if (
+            title is None or text is None or text.group(1)
+            or (ns is not None and ns.group(1) != b"0") or b"<redirect" in page
+        ):
+            yield end, None
+            continue
+        text_end = page.find(b"</text>", text.end())
+        if text_end < 0:
+            yield end, None
+            continue
+        yield end, (_decode(title.group(1)).strip(), start + text.end(), start + text_end)
+
+
+def _impact(frequency: int, length: int, base: float, per_term: float) -> float:
+    """BM25 term frequency saturation, tf / (tf + k1 * (1 - b + b * length / average length)); below 1."""
+    return frequency / (frequency + base + per_term * length)
+
+
+def _average_length(total_terms: int, documents: int) -> float:
+    return max(total_terms / documents, 1.0) if documents else 1.0
+
+
+def _scale(reference: float, actual: float) -> float:
+    """How much larger a reference BM25 constant is than the one in use (inf if only the reference is non-zero)."""
+    if actual:
+        return reference / actual
+    return math.inf if reference else 1.0
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_segment(prefix: str, docs: List[Tuple[int, int, str, int]], postings: Dict[str, List[Tuple[int, int]]]):
+    """
+    Write one segment.
+
+    The lexicon keeps, per term, the highest impact (BM25 saturation with
+    the default parameters and the segment's average document length)
+    among its postings, from which searches bound the term's score.
+
+    Args:
+        prefix: Path prefix of the segment files
+        docs: (text start, text end, title, length in terms) per document
+        postings: Term to (document, term frequency) pairs, documents in increasing order
+    """
+    titles = bytearray()
+    doc_table = bytearray()
+    for start, end, title, length in docs:
+        encoded = title.encode("utf-8")
+        doc_table += _DOC.pack(start, end, len(titles), len(encoded), length)
+        titles += encoded
+
+    base, per_term = _K1 * (1 - _B), _K1 * _B / _average_length(sum(doc[3] for doc in docs), len(docs))
+    terms, lexicon, posting_list = bytearray(), bytearray(), bytearray()
+    first = 0
+    for term in sorted(postings, key=lambda t: t.encode("utf-8")):
+        encoded = term.encode("utf-8")[:0xFFFF]
+        entries = [(doc, min(frequency, 0xFFFF)) for doc, frequency in postings[term]]
+        max_impact = max(_impact(frequency, docs[doc][3], base, per_term) for doc, frequency in entries)
+        lexicon += _LEX.pack(len(terms), len(encoded), first, len(entries), max_impact)
+        terms += encoded
+        for doc, frequency in entries:
+            posting_list += _POSTING.pack(doc, frequency)
+        first += len(entries)
+
+    by_title = sorted(range(len(docs)), key=lambda i: normalize_title(docs[i][2]))
+    title_index = b"".join(_TITLE.pack(i) for i in by_title)
+
+    for ext, data in zip(_SEGMENT_FILES, (doc_table, titles, lexicon, terms, posting_list, title_index)):
+        _write_atomic(f"{prefix}.{ext}", bytes(data))
+
+
+class Segment:
+    """A memory-mapped, immutable part of the index."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        maps = {ext: _map(f"{prefix}.{ext}") for ext in _SEGMENT_FILES}
+        self._docs, self._titles = maps["docs"], maps["titles"]
+        self._lex, self._terms = maps["lex"], maps["terms"]
+        self._post, self._tidx = maps["post"], maps["tidx"]
+        self.size = len(self._docs) // _DOC.size
+        self._lex_size = len(self._lex) // _LEX.size
+        self._lengths: Optional[List[int]] = None
+        self._average_length: Optional[float] = None
+
+    def doc(self, i: int) -> Tuple[int, int, str, int]:
+        """(text start, text end, title, length in terms) of a document."""
+        start, end, title_offset, title_length, length = _DOC.unpack_from(self._docs, i * _DOC.size)
+        return start, end, self._titles[title_offset:title_offset + title_length].decode("utf-8"), length
+
+    def length(self, i: int) -> int:
+        return _DOC.unpack_from(self._docs, i * _DOC.size)[4]
+
+    @property
+    def lengths(self) -> List[int]:
+        """Length in terms of every document, read once."""
+        if self._lengths is None:
+            self._lengths = [record[4] for record in _DOC.iter_unpack(self._docs)]
+        return self._lengths
+
+    @property
+    def average_length(self) -> float:
+        if self._average_length is None:
+            self._average_length = _average_length(sum(self.lengths), self.size)
+        return self._average_length
+
+    def lookup(self, term: str) -> Optional[Tuple[int, int, float]]:
+        """(first posting, document frequency, max impact) of a term, or None."""
+        wanted = term.encode("utf-8")
+        low, high = 0, self._lex_size
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, first, df, max_impact = _LEX.unpack_from(self._lex, middle * _LEX.size)
+            found = self._terms[offset:offset + length]
+            if found == wanted:
+                return first, df, max_impact
+            if found < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def document_frequency(self, term: str) -> int:
+        entry = self.lookup(term)
+        return entry[1] if entry else 0
+
+    def postings(self, term: str) -> List[Tuple[int, int]]:
+        entry = self.lookup(term)
+        return self.scan(entry) if entry else []
+
+    def scan(self, entry: Tuple[int, int, float]) -> List[Tuple[int, int]]:
+        """(document, term frequency) pairs of a looked up term."""
+        first, df = entry[0], entry[1]
+        return list(_POSTING.iter_unpack(self._post[first * _POSTING.size:(first + df) * _POSTING.size]))
+
+    def frequency(self, entry: Tuple[int, int, float], doc: int) -> int:
+        """Frequency of a looked up term in one document (binary search of its postings), 0 if absent."""
+        low, high = entry[0], entry[0] + entry[1]
+        while low < high:
+            middle = (low + high) // 2
+            found, frequency = _POSTING.unpack_from(self._post, middle * _POSTING.size)
+            if found == doc:
+                return frequency
+            if found < doc:
+                low = middle + 1
+            else:
+                high = middle
+        return 0
+
+    def find_title(self, title: str) -> Optional[int]:
+        """Document with this title (case and underscores ignored), or None."""
+        wanted = normalize_title(title)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            (doc,) = _TITLE.unpack_from(self._tidx, middle * _TITLE.size)
+            found = normalize_title(self.doc(doc)[2])
+            if found == wanted:
+                return doc
+            if found < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+class WikiArticle:
+    """An article of the dump whose sections are split and decoded only when read."""
+
+    def __init__(self, title: str, dump, start: int, end: int):
+        self.title = title
+        self._dump = dump
+        self.start = start
+        self.end = end
+        self._sections: Optional[List[Tuple[str, int, int]]] = None
+
+    @property
+    def sections(self) -> List[Tuple[str, int, int]]:
+        """(title, start, end) per section, as dump offsets. The lead section is "Introduction"."""
+        if self._sections is None:
+            raw = self._dump[self.start:self.end]
+            headings = list(_HEADING_RE.finditer(raw))
+            sections = [("Introduction", self.start, self.start + (headings[0].start() if headings else len(raw)))]
+            for i, match in enumerate(headings):
+                end = headings[i + 1].start() if i + 1 < len(headings) else len(raw)
+                sections.append((_decode(match.group(2)).strip(), self.start + match.end(), self.start + end))
+            self._sections = sections
+        return self._sections
+
+    def table_of_contents(self) -> str:
+        return "\n".join(f"{i}. {title} ({end - start} bytes)" for i, (title, start, end) in enumerate(self.sections))
+
+    def read_section(self, section, max_chars: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Read one section as plain text.
+
+        Args:
+            section: Section number, or a (case-insensitive) part of its title
+            max_chars: Text is truncated to this length (0 = no limit)
+
+        Returns:
+            Dict with title, text and truncated flag, or None if there is no such section
+        """
+        match = None
+        for i, (title, start, end) in enumerate(self.sections):
+            if str(section).isdigit():
+                if i == int(section):
+                    match = (title, start, end)
+                    break
+            elif str(section).lower() in title.lower():
+                match = (title, start, end)
+                break
+        if match is None:
+            return None
+        title, start, end = match
+        text = clean_wikitext(_decode(self._dump[start:end]))
+        truncated = bool(max_chars) and len(text) > max_chars
+        if truncated:
+            text = text[:max_chars]
+        return {"title": title, "text": text, "truncated": truncated}
+
+    def lead(self, max_chars: int = 600) -> str:
+        """Start of the article's plain text, for result snippets."""
+        title, start, end = self.sections[0]
+        # The lead of long articles is clipped before cleaning; markup makes up most of it
+        text = clean_wikitext(_decode(self._dump[start:min(end, start + max_chars * 8)]))
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + " ..."
+        return text
+
+
+class WikiIndex:
+    """
+    Incremental, memory-mapped inverted index over a Wikipedia dump.
+
+    A manifest next to the segments records the dump it was built from
+    (path and a hash of its first bytes), the byte offset the next build
+    continues from and the corpus statistics used for BM25. The hash covers
+    the first 64 KiB, or the whole dump if it was shorter when indexed, and
+    is extended as the dump grows, so appending to a short dump does not
+    look like a new dump. Searches pick up segments written by a build
+    running in another process.
+    """
+
+    def __init__(self, dump_path: str, index_path: str, segment_articles: int = 20000):
+        """
+        Args:
+            dump_path: Uncompressed pages-articles XML dump
+            index_path: Directory for the index segments
+            segment_articles: Articles per segment written while building
+        """
+        self.dump_path = dump_path
+        self.index_path = index_path
+        self.segment_articles = segment_articles
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Any] = {}
+        self._manifest_mtime: Optional[float] = None
+        self._segments: List[Segment] = []
+        self._dump = None
+        self._dump_size = 0
+        os.makedirs(index_path, exist_ok=True)
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.index_path, "manifest.json")
+
+    def _signature(self, length: int) -> str:
+        with open(self.dump_path, "rb") as f:
+            return hashlib.sha1(f.read(length)).hexdigest()
+
+    def _built_from_dump(self, manifest: Dict[str, Any]) -> bool:
+        """Whether an index manifest belongs to the current dump, in the current format."""
+        return (
+            manifest.get("format") == _FORMAT
+            and manifest.get("dump") == os.path.abspath(self.dump_path)
+            and manifest.get("signature") == self._signature(manifest.get("signature_bytes", _SIGNATURE_BYTES))
+        )
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _empty_manifest(self) -> Dict[str, Any]:
+        return {
+            "format": _FORMAT,
+            "build": uuid.uuid4().hex,
+            "dump": os.path.abspath(self.dump_path),
+            "offset": 0,
+            "articles": 0,
+            "terms": 0,
+            "segments": [],
+        }
+
+    def _dump_map(self):
+        size = os.path.getsize(self.dump_path)
+        if self._dump is None or size != self._dump_size:
+            # The dump grew since it was mapped
+            self._dump, self._dump_size = _map(self.dump_path), size
+        return self._dump
+
+    def _load(self):
+        """(Re)open the segments if the manifest changed."""
+        try:
+            mtime = os.path.getmtime(self._manifest_path)
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return
+        manifest = self._read_manifest()
+        if manifest and manifest.get("format") != _FORMAT:
+            logger.warning(f"Index at {self.index_path} has an old format; rebuild it with python -m src.utils.wiki_index")
+            manifest = {}
+        known = {segment.prefix: segment for segment in self._segments}
+        if manifest.get("build") != self._manifest.get("build"):
+            # Rebuilt from scratch: segment names are reused. Dropped segments are
+            # unmapped when garbage collected, as a search may still be reading them.
+            known = {}
+        self._segments = [
+            known.get(prefix) or Segment(prefix)
+            for prefix in (os.path.join(self.index_path, name) for name in manifest.get("segments", []))
+        ]
+        self._manifest, self._manifest_mtime = manifest, mtime
+
+    @property
+    def articles(self) -> int:
+        with self._lock:
+            self._load()
+            return self._manifest.get("articles", 0)
+
+    def build(self, max_articles: Optional[int] = None) -> int:
+        """
+        Index the dump's articles after the point the last build reached.
+
+        An index built from another dump is discarded first.
+
+        Args:
+            max_articles: Stop after indexing this many articles (None = up to the end of the dump)
+
+        Returns:
+            Number of articles indexed
+        """
+        manifest = self._read_manifest()
+        if not self._built_from_dump(manifest):
+            if manifest:
+                logger.info(f"Index at {self.index_path} was built from another dump or format; rebuilding")
+            manifest = self._empty_manifest()
+
+        dump = _map(self.dump_path)
+        # The hashed bytes are unchanged, so the hash can cover what the dump has grown by
+        signature_bytes = min(len(dump), _SIGNATURE_BYTES)
+        manifest["signature"] = hashlib.sha1(dump[:signature_bytes]).hexdigest()
+        manifest["signature_bytes"] = signature_bytes
+        added = 0
+        docs: List[Tuple[int, int, str, int]] = []
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+        def flush(offset: int):
+            name = f"segment{len(manifest['segments']) + 1:05d}"
+            if docs:
+                write_segment(os.path.join(self.index_path, name), docs, postings)
+                manifest["segments"].append(name)
+                manifest["articles"] += len(docs)
+                manifest["terms"] += sum(doc[3] for doc in docs)
+            manifest["offset"] = offset
+            _write_atomic(self._manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+            logger.info(f"Indexed {manifest['articles']} articles, up to byte {offset} of {self.dump_path}")
+            docs.clear()
+            postings.clear()
+
+        offset = manifest["offset"]
+        for offset, article in scan_pages(dump, offset):
+            if article is None:
+                continue
+            title, start, end = article
+            body = tokenize(clean_wikitext(_decode(dump[start:end])))
+            frequencies = Counter(body)
+            for term in tokenize(title):
+                frequencies[term] += _TITLE_BOOST
+            doc = len(docs)
+            for term, frequency in frequencies.items():
+                postings[term].append((doc, frequency))
+            docs.append((start, end, title, len(body)))
+            added += 1
+            if len(docs) >= self.segment_articles:
+                flush(offset)
+            if max_articles and added >= max_articles:
+                break
+        flush(offset)
+        if isinstance(dump, mmap.mmap):
+            dump.close()
+        return added
+
+    def search(self, query: str, limit: int = 5, k1: float = _K1, b: float = _B) -> List[Dict[str, Any]]:
+        """
+        Search articles by BM25 relevance.
+
+        Only the best `limit` articles are needed, so postings are pruned
+        with MaxScore. Every term has a score bound in each segment: its idf
+        times its highest impact there, scaled up if this search's
+        parameters or average length can raise impacts. In each segment,
+        the weakest terms whose bounds add up to no more than the current
+        limit-th best score cannot make a document enter the results on
+        their own: their postings are not scanned, they are only looked up
+        for documents found through the stronger terms, and only while the
+        document can still enter. The results are those of a full scan.
+
+        Args:
+            query: Free-text search query
+            limit: Maximum number of articles to return
+
+        Returns:
+            List of dicts with title, score and snippet (start of the lead section), best match first
+        """
+        terms = sorted(set(tokenize(query)))
+        with self._lock:
+            self._load()
+            segments, manifest = list(self._segments), self._manifest
+            dump = self._dump_map() if segments else None
+        total = manifest.get("articles", 0)
+        if not terms or not total or limit <= 0:
+            return []
+        # BM25 term score: idf * (k1 + 1) * tf / (tf + base + per_term * length)
+        base, per_term = k1 * (1 - b), k1 * b / _average_length(manifest.get("terms", 0), total)
+
+        entries = [[segment.lookup(term) for term in terms] for segment in segments]
+        idfs = []
+        for t in range(len(terms)):
+            df = sum(segment_entries[t][1] for segment_entries in entries if segment_entries[t])
+            idfs.append(math.log(1 + (total - df + 0.5) / (df + 0.5)) * (k1 + 1))
+
+        top: List[Tuple[float, int, int]] = []  # (score, segment, document), worst first
+        for s, segment in enumerate(segments):
+            # tf / (tf + base + per_term * length) is at most slack times the stored impact
+            slack = max(
+                1.0,
+                _scale(_K1 * (1 - _B), base),
+                _scale(_K1 * _B / segment.average_length, per_term),
+            )
+            present = []
+            for idf, entry in zip(idfs, entries[s]):
+                if entry:
+                    # Stored as float32: round the bound up
+                    bound = idf * min(1.0, entry[2] * slack * (1 + 1e-6))
+                    present.append((bound, idf, entry))
+            if not present:
+                continue
+            present.sort(key=lambda term: term[0])
+            threshold = top[0][0] if len(top) >= limit else 0.0
+
+            # Weakest terms that together cannot lift a document past the threshold
+            lookup_only, bounds = 0, 0.0
+            while lookup_only < len(present) and bounds + present[lookup_only][0] <= threshold:
+                bounds += present[lookup_only][0]
+                lookup_only += 1
+            if lookup_only == len(present):
+                continue
+
+            lengths = segment.lengths
+            scores: Dict[int, float] = defaultdict(float)
+            for _, idf, entry in present[lookup_only:]:
+                for doc, frequency in segment.scan(entry):
+                    scores[doc] += idf * frequency / (frequency + base + per_term * lengths[doc])
+
+            candidates = scores.items()
+            if lookup_only:
+                # Best partial scores first, so the loop can stop at the first one that cannot enter
+                candidates = sorted(
+                    ((doc, score) for doc, score in candidates if score + bounds > threshold),
+                    key=lambda item: item[1],
+                    reverse=True,
+                )
+            for doc, score in candidates:
+                if len(top) >= limit:
+                    if score + bounds <= top[0][0]:
+                        if lookup_only:
+                            break
+                        continue
+                remaining = bounds
+                for t in range(lookup_only - 1, -1, -1):
+                    bound, idf, entry = present[t]
+                    frequency = segment.frequency(entry, doc)
+                    if frequency:
+                        score += idf * frequency / (frequency + base + per_term * lengths[doc])
+                    remaining -= bound
+                    if len(top) >= limit and score + remaining <= top[0][0]:
+                        break
+                if len(top) < limit:
+                    heapq.heappush(top, (score, s, doc))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, s, doc))
+
+        results = []
+        for score, s, doc in sorted(top, reverse=True):
+            start, end, title, _ = segments[s].doc(doc)
+            results.append({"title": title, "score": round(score, 3), "snippet": WikiArticle(title, dump, start, end).lead()})
+        return results
+
+    def article(self, title: str) -> Optional[WikiArticle]:
+        """Indexed article with this title (case and underscores ignored), or None."""
+        with self._lock:
+            self._load()
+            segments = list(self._segments)
+            dump = self._dump_map() if segments else None
+        for segment in segments:
+            doc = segment.find_title(title)
+            if doc is not None:
+                start, end, found, _ = segment.doc(doc)
+                return WikiArticle(found, dump, start, end)
+        return None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build or extend the Wikipedia dump index")
+    parser.add_argument("--dump", default=settings.WIKIPEDIA_DUMP_PATH, help="Uncompressed pages-articles XML dump")
+    parser.add_argument("--index", default=settings.WIKIPEDIA_INDEX_PATH, help="Index directory")
+    parser.add_argument("--segment-articles", type=int, default=settings.WIKIPEDIA_SEGMENT_ARTICLES, help="Articles per segment")
+    parser.add_argument("--max-articles", type=int, help="Stop after indexing this many articles")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    if not args.dump:
+        raise SystemExit("No dump given (--dump or WIKIPEDIA_DUMP_PATH)")
+    index = WikiIndex(args.dump, args.index, args.segment_articles)
+    added = index.build(args.max_articles)
+    print(f"Indexed {added} articles; {index.articles} in {args.index}")